@@ -1,10 +1,35 @@
 # app/main.py
-from fastapi import FastAPI
+import math
+
+from fastapi import FastAPI, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from app.routes import users, events 
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from app.routes import users, events, currency
+from app.services.auth import token_cache
+from app.services.concurrency import conflict_stats
+from app.services.db import ping_database
+from app.services.indexes import bootstrap_indexes
+from app.services.log import CorrelationIdMiddleware
+from app.services.metrics import MetricsMiddleware, cache_stats_collector
+from app.services.rate_history import rate_history
+from app.services.settlement_preview import settlement_previews
+from app.services.simple_exchange_rates import exchange_service
+from app.services.tracing import TracingMiddleware, install_fastapi_hooks, otlp_exporter
+from app.services.view_cache import event_view_cache
 
 app = FastAPI()
 
+
+@app.exception_handler(RequestValidationError)
+async def request_validation_error(request: Request, exc: RequestValidationError):
+    """The stock 422, except that rejected inf/NaN inputs are echoed as strings - JSON has no literal for them"""
+    detail = jsonable_encoder(exc.errors(), custom_encoder={float: lambda v: v if math.isfinite(v) else str(v)})
+    return JSONResponse(status_code=422, content={"detail": detail})
+
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -12,13 +37,51 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Added last = outermost: the correlation ID is set for everything, metrics see the whole
+# request, the trace covers everything inside CORS
+app.add_middleware(TracingMiddleware, fastapi_app=app)
+app.add_middleware(MetricsMiddleware, fastapi_app=app)
+app.add_middleware(CorrelationIdMiddleware)
+install_fastapi_hooks()
+
+cache_stats_collector.add_cache("event_view", event_view_cache.stats)
+cache_stats_collector.add_cache("token", token_cache.stats, gauges=("hit_rate", "size", "max_size", "revoked"))
+cache_stats_collector.add_cache(
+    "exchange_rates", exchange_service.cache_stats,
+    gauges=("hit_rate", "age_seconds", "ttl_seconds", "cached_currencies")
+)
+cache_stats_collector.add_cache("settlement_preview", settlement_previews.stats)
+cache_stats_collector.add_cache("cross_rates", rate_history.cross_rates_stats)
+cache_stats_collector.set_conflict_stats(conflict_stats.stats)
+
+@app.on_event("startup")
+async def startup():
+    await ping_database()
+    await bootstrap_indexes()
+    exchange_service.start_background_refresh()
+    await rate_history.load()
+    rate_history.start_sync()
+
+@app.on_event("shutdown")
+async def shutdown():
+    exchange_service.stop_background_refresh()
+    rate_history.stop_sync()
+    if otlp_exporter is not None:
+        otlp_exporter.shutdown()
 
 @app.get("/")
-def read_root():
+async def read_root():
     return {"status": "ok"}
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return Response(generate_latest(), headers={"Content-Type": CONTENT_TYPE_LATEST})
+
 # Users routes
 app.include_router(users.router, prefix="/users", tags=["Users"])
 
 # Events routes
 app.include_router(events.router, prefix="/events", tags=["Events"])
+
+# Currency routes
+app.include_router(currency.router, prefix="/currency", tags=["Currency"])
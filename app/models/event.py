@@ -2,10 +2,15 @@
 # Updated models with automatic exchange rates
 # Comments are in English, without emojis
 
-from pydantic import BaseModel, EmailStr, validator
-from typing import List, Optional, Dict
+from pydantic import BaseModel, EmailStr, Field, validator
+from typing import Annotated, List, Optional, Dict
 from datetime import datetime
 
+from app.models.money import MAX_MAJOR_AMOUNT
+
+# Money in expense input: finite and small enough for integer minor units (see app/models/money.py)
+MoneyInput = Annotated[float, Field(allow_inf_nan=False, ge=-MAX_MAJOR_AMOUNT, le=MAX_MAJOR_AMOUNT)]
+
 
 # -----------------------------
 # Member models
@@ -67,8 +72,8 @@ class ParticipantExpense(BaseModel):
     - paid: amount they actually paid
     """
     email: str
-    responsible_for: float
-    paid: float
+    responsible_for: MoneyInput
+    paid: MoneyInput
 
 
 # -----------------------------
@@ -82,7 +87,7 @@ class FlexibleExpense(BaseModel):
     - currency: original currency of the expense
     - participants: list of participants with shares and payments
     """
-    amount: float
+    amount: MoneyInput
     currency: str
     participants: List[ParticipantExpense]
     note: str = ""
@@ -126,10 +131,12 @@ class SimpleExpense(BaseModel):
 class ExpenseOut(BaseModel):
     """
     Expense as returned from database:
+    - id: stable expense ID, used to update or delete it
     - amount: in original currency
     - amount_in_base_currency: normalized to event base currency
     - exchange_rate: used for conversion (if applicable)
     """
+    id: str
     payer_id: str
     amount: float
     currency: str
@@ -140,6 +147,19 @@ class ExpenseOut(BaseModel):
     created_at: datetime
 
 
+class ExpenseMutationOut(BaseModel):
+    """
+    Minimal response for expense writes (return=minimal):
+    - expense: the created or updated expense
+    - balances: new balances of the members the write touched
+    - version: event version after the write
+    """
+    event_id: str
+    version: int
+    expense: ExpenseOut
+    balances: List[MemberOut]
+
+
 # -----------------------------
 # Event output model
 # -----------------------------
@@ -148,7 +168,8 @@ class EventOut(BaseModel):
     """
     Event output model with all details:
     - members
-    - expenses
+    - expenses: one page, newest first (empty in summary mode)
+    - next_cursor: pass as "after" to get the next page, None on the last page
     - total_expenses in base currency
     """
     id: str
@@ -158,9 +179,40 @@ class EventOut(BaseModel):
     created_at: datetime
     members: List[MemberOut]
     expenses: List[ExpenseOut]
+    next_cursor: Optional[str] = None
     total_expenses: float
 
 
+class EventMemberRef(BaseModel):
+    """A member as stored on the event (no balance)"""
+    user_id: str
+    email: EmailStr
+
+
+class EventListItem(BaseModel):
+    """
+    One row of the /my-events listing:
+    - expenses_count: stored counter, expenses are never loaded for the listing
+    - last_activity_at: time of the last expense change (or event creation)
+    """
+    id: str
+    name: str
+    base_currency: str
+    created_by: Optional[str]
+    created_at: datetime
+    members: List[EventMemberRef]
+    expenses_count: int
+    last_activity_at: datetime
+
+
+class MyEventsOut(BaseModel):
+    """One page of the user's events, newest first"""
+    user_id: str
+    events_count: int  # events on this page
+    events: List[EventListItem]
+    next_cursor: Optional[str] = None
+
+
 # -----------------------------
 # Settlement and summary models
 # -----------------------------
@@ -188,6 +240,22 @@ class EventSummary(BaseModel):
     total_expenses: float
 
 
+class SettlementPreviewOut(BaseModel):
+    """
+    Read-only settlement preview at the event's current version (nothing is stored):
+    - currency: the currency balances and payments are converted into
+    - rates_key: which rates were used (rate snapshot ID, or live:<time>)
+    """
+    event_id: str
+    event_name: str
+    currency: str
+    version: int
+    member_balances: Dict[str, float]
+    payments_needed: List[Payment]
+    total_expenses: float
+    rates_key: str
+
+
 # -----------------------------
 # Exchange rate related models
 # -----------------------------
@@ -0,0 +1,83 @@
+# app/models/money.py
+# Money as integer minor units (cents, yen, fils...)
+# Everything stored in Mongo and every sum is an exact integer - floats only at the API edge
+
+from decimal import ROUND_HALF_EVEN, Decimal
+from typing import Iterable
+
+import numpy as np
+
+# Amounts in minor units of their currency (USD 12.34 -> 1234, JPY 500 -> 500)
+MinorUnits = int
+
+# Marker stored on events and expenses written in minor units (see app/scripts/migrate_money.py)
+MONEY_UNITS = "minor"
+
+# ISO 4217 exponents that differ from the usual 2 decimals
+CURRENCY_EXPONENTS = {
+    "JPY": 0,
+    "KRW": 0,
+    "VND": 0,
+    "CLP": 0,
+    "ISK": 0,
+    "UGX": 0,
+    "BHD": 3,
+    "KWD": 3,
+    "OMR": 3,
+    "JOD": 3,
+    "TND": 3,
+}
+DEFAULT_EXPONENT = 2
+
+# Largest amount accepted, in minor units: exact as a float64 and leaves int64
+# room for sums of thousands of such amounts
+MAX_MINOR_UNITS = 10 ** 15
+# The same bound in major units for the finest currency (3 decimals) - a coarse
+# check for request models, to_minor applies the exact one
+MAX_MAJOR_AMOUNT = MAX_MINOR_UNITS // 10 ** max(CURRENCY_EXPONENTS.values())
+
+_INT64_MAX = np.iinfo(np.int64).max
+
+
+def currency_exponent(currency: str) -> int:
+    """Number of decimals of the currency's minor unit"""
+    return CURRENCY_EXPONENTS.get(currency, DEFAULT_EXPONENT)
+
+
+def to_minor(amount: float, currency: str, strict: bool = True) -> MinorUnits:
+    """
+    Major amount -> integer minor units (12.34 USD -> 1234).
+    strict: raise ValueError when the amount has more decimals than the currency allows,
+    otherwise round half to even (used when migrating stored floats).
+    Raises ValueError for NaN, infinities and amounts past MAX_MINOR_UNITS.
+    """
+    scaled = Decimal(str(amount)).scaleb(currency_exponent(currency))
+    if not scaled.is_finite():
+        raise ValueError(f"{amount} is not a valid amount")
+    whole = scaled.to_integral_value(rounding=ROUND_HALF_EVEN)
+    if strict and whole != scaled:
+        raise ValueError(f"{amount} has more decimals than {currency} allows")
+    if abs(whole) > MAX_MINOR_UNITS:
+        raise ValueError(f"{amount} {currency} is out of range")
+    return int(whole)
+
+
+def from_minor(units: MinorUnits, currency: str) -> float:
+    """Integer minor units -> major amount for API output (1234 USD -> 12.34)"""
+    exponent = currency_exponent(currency)
+    return float(Decimal(int(units)).scaleb(-exponent)) if exponent else float(units)
+
+
+def sum_minor(values: Iterable[MinorUnits]) -> MinorUnits:
+    """
+    Exact bulk sum of minor-unit amounts (int64, no drift however many terms).
+    Values must fit in int64 (OverflowError otherwise); a sum that could pass
+    the int64 range is added as Python ints instead of wrapping around.
+    """
+    array = np.fromiter(values, dtype=np.int64)
+    if not array.size:
+        return 0
+    largest = max(abs(int(array.max())), abs(int(array.min())))
+    if largest > _INT64_MAX // array.size:
+        return sum(array.tolist())
+    return int(array.sum())
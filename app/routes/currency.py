@@ -0,0 +1,97 @@
+# app/routes/currency.py - שערי חליפין
+from fastapi import APIRouter, HTTPException
+from datetime import datetime
+from typing import List, Optional
+import numpy as np
+from app.models.event import CurrencyConversionRequest, CurrencyConversionResponse, ExchangeRatesResponse
+from app.models.money import currency_exponent
+from app.services.simple_exchange_rates import exchange_service
+from app.services.rate_history import rate_history
+
+router = APIRouter()
+
+# Conversions accepted in one /convert call
+MAX_CONVERSIONS = 1000
+
+
+@router.get("/rates", response_model=ExchangeRatesResponse)
+async def get_rates(as_of: Optional[datetime] = None):
+    """
+    Exchange rates against USD:
+    - current: straight from the in-process cache
+    - as_of: the stored snapshot in effect at that time
+    """
+    if as_of is not None:
+        snapshot = rate_history.rates_as_of(as_of)
+        if snapshot is None:
+            raise HTTPException(status_code=404, detail=f"No exchange rates stored as of {as_of.isoformat()}")
+        return ExchangeRatesResponse(
+            base_currency="USD",
+            rates=snapshot.rates,
+            supported_currencies=["USD"] + sorted(snapshot.rates.keys()),
+            last_updated=snapshot.as_of.isoformat()
+        )
+
+    rates = exchange_service.get_rates()
+    last_updated = exchange_service.last_updated
+    return ExchangeRatesResponse(
+        base_currency="USD",
+        rates=rates,
+        supported_currencies=["USD"] + sorted(rates.keys()),
+        last_updated=last_updated.isoformat() if last_updated else "fallback"
+    )
+
+
+@router.get("/rates/cache")
+async def get_rates_cache_stats():
+    """Exchange-rate cache hit/miss counters and age, for monitoring"""
+    return exchange_service.cache_stats()
+
+
+@router.get("/rates/history")
+async def get_rates_history_stats():
+    """How much rate history is indexed in memory"""
+    return rate_history.stats()
+
+
+@router.post("/convert", response_model=List[CurrencyConversionResponse])
+async def convert(conversions: List[CurrencyConversionRequest], as_of: Optional[datetime] = None):
+    """
+    Convert many amounts in one call, all with the same rates:
+    - current: the live cache
+    - as_of: the stored snapshot in effect at that time
+    Each converted amount is rounded to its target currency's minor unit.
+    """
+    if len(conversions) > MAX_CONVERSIONS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_CONVERSIONS} conversions per call")
+
+    if as_of is not None:
+        snapshot = rate_history.rates_as_of(as_of)
+        if snapshot is None:
+            raise HTTPException(status_code=404, detail=f"No exchange rates stored as of {as_of.isoformat()}")
+        cross_rates = rate_history.cross_rates(snapshot)
+        last_updated = snapshot.as_of.isoformat()
+    else:
+        cross_rates = exchange_service.get_cross_rates()
+        updated = exchange_service.last_updated
+        last_updated = updated.isoformat() if updated else "fallback"
+
+    from_currencies = [c.from_currency.strip().upper() for c in conversions]
+    to_currencies = [c.to_currency.strip().upper() for c in conversions]
+    unsupported = sorted({c for c in from_currencies + to_currencies if c not in cross_rates})
+    if unsupported:
+        raise HTTPException(status_code=400, detail=f"Currencies not supported: {', '.join(unsupported)}")
+
+    amounts = np.fromiter((c.amount for c in conversions), dtype=float, count=len(conversions))
+    converted = cross_rates.convert_many(amounts, from_currencies, to_currencies)
+    return [
+        CurrencyConversionResponse(
+            original_amount=conversion.amount,
+            from_currency=from_currency,
+            to_currency=to_currency,
+            converted_amount=round(float(amount), currency_exponent(to_currency)),
+            exchange_rate=cross_rates.rate(from_currency, to_currency),
+            last_updated=last_updated
+        )
+        for conversion, from_currency, to_currency, amount in zip(conversions, from_currencies, to_currencies, converted)
+    ]
@@ -1,26 +1,308 @@
 # ✅ app/routes/events.py - גרסה מתקדמת עם תשלומים + אחראיות + שערי חליפין אוטומטיים
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
 from datetime import datetime
 from bson import ObjectId
+from app.models.money import MONEY_UNITS, from_minor, sum_minor, to_minor
 from app.models.event import (
     FlexibleEventCreate, 
     EventOut, 
+    EventListItem,
+    MyEventsOut,
+    MemberOut,
+    ExpenseMutationOut,
     ExpenseOut, 
     EventSummary,
+    SettlementPreviewOut,
     FlexibleExpense,
     Payment
 )
 from app.services.db import db
+from app.services.log import get_logger
+from pymongo import ReturnDocument
 from app.services.auth import get_current_user
 from app.services.simple_exchange_rates import exchange_service
-from typing import List, Dict
+from app.services.rate_history import RateSnapshot, rate_history
+from app.services.settlement_preview import SettlementPreview, settlement_previews
+from app.services.cross_rates import CrossRateMatrix
+from app.services.settlement import Transfer, plan_payments
+from app.services.balances import BalanceMatrix, convert_totals, total_major
+from app.services.concurrency import VersionConflict, version_filter, with_version_retry
+from app.services.view_cache import event_view_cache, etag_matches, make_etag
+from app.services.tracing import span
+from app.services.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    NEWEST_FIRST,
+    after_cursor_filter,
+    encode_cursor
+)
+from typing import List, Dict, Optional, Tuple, Union
 
 router = APIRouter()
 users_collection = db["users"]
 events_collection = db["events"]
+expenses_collection = db["expenses"]
+logger = get_logger(__name__)
+
+# Fields needed to render an event - everything except finalize results
+EVENT_VIEW_PROJECTION = {
+    "name": 1,
+    "base_currency": 1,
+    "created_by": 1,
+    "created_at": 1,
+    "members": 1,
+    "currency_balances": 1,
+    "total_expenses_by_currency": 1,
+    "version": 1
+}
+
+# Fields needed to answer finalize from its stored result
+SETTLEMENT_PROJECTION = {
+    "name": 1,
+    "members": 1,
+    "version": 1,
+    "last_settlement": 1,
+    "final_balances": 1,
+    "final_payments": 1
+}
+
+# Fields shown in the /my-events listing
+EVENT_LIST_PROJECTION = {
+    "name": 1,
+    "base_currency": 1,
+    "created_by": 1,
+    "created_at": 1,
+    "members": 1,
+    "expenses_count": 1,
+    "last_activity_at": 1
+}
+
+
+def _expense_increments(expense: dict, sign: int = 1) -> Dict[str, int]:
+    """
+    Build the $inc document for applying (sign=1) or reversing (sign=-1) an expense.
+    Uses dotted currency_balances.<CUR>.<user_id> paths so the write touches only
+    the affected counters, never the whole event. All amounts are integer minor units.
+    """
+    currency = expense["currency"]
+    inc = {f"total_expenses_by_currency.{currency}": sign * expense["amount"]}
+    for participant in expense.get("participants", []):
+        # Old-style expenses (share only) never touched the balances
+        if "paid" not in participant or "responsible_for" not in participant:
+            continue
+        path = f"currency_balances.{currency}.{participant['user_id']}"
+        inc[path] = inc.get(path, 0) + sign * (participant["paid"] - participant["responsible_for"])
+    return inc
+
+
+def _merge_increments(*increments: Dict[str, int]) -> Dict[str, int]:
+    """Combine several $inc documents - MongoDB rejects the same path twice"""
+    merged: Dict[str, int] = {}
+    for inc in increments:
+        for path, value in inc.items():
+            merged[path] = merged.get(path, 0) + value
+    return merged
+
+
+async def _drop_empty_currency(event_oid: ObjectId, currency: str) -> Optional[int]:
+    """
+    Remove a currency once no expenses are left in it (total is exactly 0).
+    Returns the event's new version if it was removed, None if other expenses still use it.
+    """
+    event = await events_collection.find_one_and_update(
+        {"_id": event_oid, f"total_expenses_by_currency.{currency}": 0},
+        {
+            "$unset": {
+                f"total_expenses_by_currency.{currency}": "",
+                f"currency_balances.{currency}": ""
+            },
+            "$inc": {"version": 1}
+        },
+        projection={"version": 1},
+        return_document=ReturnDocument.AFTER
+    )
+    if not event:
+        return None
+    settlement_previews.advance(str(event_oid), event["version"])
+    return event["version"]
+
+
+async def _load_expense_page(
+    event_oid: ObjectId,
+    limit: int = DEFAULT_PAGE_SIZE,
+    after: Optional[str] = None
+) -> Tuple[List[dict], Optional[str]]:
+    """
+    One page of an event's expenses, newest first.
+    Reads limit + 1 documents through the index to know whether another page exists.
+    """
+    query = {"event_id": event_oid, **after_cursor_filter(after)}
+    cursor = expenses_collection.find(query).sort(NEWEST_FIRST).limit(limit + 1)
+    expenses = [expense async for expense in cursor]
+
+    next_cursor = None
+    if len(expenses) > limit:
+        expenses = expenses[:limit]
+        next_cursor = encode_cursor(expenses[-1]["created_at"], expenses[-1]["_id"])
+    return expenses, next_cursor
+
+
+def _expense_out(expense: dict) -> ExpenseOut:
+    """Expense document (minor units) -> API model (handles old share-only participants)"""
+    currency = expense["currency"]
+    participants_for_output = []
+    for p in expense.get("participants", []):
+        if "paid" in p and "responsible_for" in p:
+            participants_for_output.append({
+                "user_id": p["user_id"],
+                "share": from_minor(p["paid"], currency),
+                "responsible_for": from_minor(p["responsible_for"], currency),
+                "paid": from_minor(p["paid"], currency)
+            })
+        elif "share" in p:
+            participants_for_output.append({"user_id": p["user_id"], "share": from_minor(p["share"], currency)})
+        else:
+            participants_for_output.append({"user_id": p.get("user_id", ""), "share": 0.0})
+
+    amount = from_minor(expense["amount"], currency)
+    return ExpenseOut(
+        id=str(expense["_id"]),
+        payer_id=expense.get("created_by", expense.get("payer_id", "")),
+        amount=amount,
+        currency=currency,
+        amount_in_base_currency=amount,
+        participants=participants_for_output,
+        note=expense.get("note", ""),
+        exchange_rate=None,
+        created_at=expense["created_at"]
+    )
+
+
+def _members_with_balance(event: dict, user_ids: Optional[set] = None) -> List[dict]:
+    """Members (all, or only user_ids) with their balance summed over every currency"""
+    members = [m for m in event["members"] if user_ids is None or m["user_id"] in user_ids]
+    # Only the requested rows are built; the matrix's first rows are these members, in this order
+    totals = BalanceMatrix.from_event(event, user_ids).totals().tolist()
+    return [
+        {"user_id": m["user_id"], "email": m["email"], "balance": balance}
+        for m, balance in zip(members, totals)
+    ]
+
+
+def _event_out(event: dict, expenses: List[dict], next_cursor: Optional[str]) -> EventOut:
+    """The one EventOut builder: event document + a page of its expenses"""
+    return EventOut(
+        id=str(event["_id"]),
+        name=event["name"],
+        base_currency=event.get("base_currency") or "FLEXIBLE",
+        created_by=event["created_by"],
+        created_at=event["created_at"],
+        members=_members_with_balance(event),
+        expenses=[_expense_out(expense) for expense in expenses],
+        next_cursor=next_cursor,
+        total_expenses=total_major(event.get("total_expenses_by_currency", {}))
+    )
+
+
+def _mutation_result(event: dict, expense: dict, touched: List[dict]) -> ExpenseMutationOut:
+    """
+    Minimal response for an expense write - its cost does not depend on the event size:
+    the written expense, balances of the members the write touched, and the new version.
+    """
+    changed_ids = {p["user_id"] for exp in touched for p in exp.get("participants", [])}
+    balances = [MemberOut(**member) for member in _members_with_balance(event, changed_ids)]
+    return ExpenseMutationOut(
+        event_id=str(event["_id"]),
+        version=event.get("version", 0),
+        expense=_expense_out(expense),
+        balances=balances
+    )
+
+
+async def _find_users_by_email(emails: List[str], creator_id: str) -> Tuple[Dict[str, dict], Optional[dict]]:
+    """
+    Resolve the creator and every invited email with a single $in query.
+    Returns (email -> user, creator user or None).
+    """
+    creator_oid = ObjectId(creator_id)
+    cursor = users_collection.find(
+        {"$or": [{"_id": creator_oid}, {"email": {"$in": emails}}]},
+        {"email": 1}
+    )
+    users_by_email, creator = {}, None
+    async for user in cursor:
+        users_by_email[user["email"]] = user
+        if user["_id"] == creator_oid:
+            creator = user
+    return users_by_email, creator
+
+
+def _minor_amount(amount: float, currency: str) -> int:
+    """to_minor for request input - too many decimals or an out-of-range amount is a 400"""
+    try:
+        return to_minor(amount, currency)
+    except (ValueError, OverflowError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _validate_amounts(expense: FlexibleExpense) -> int:
+    """
+    Exact checks that responsibilities and payments both add up to the amount.
+    Returns the amount in minor units.
+    """
+    amount = _minor_amount(expense.amount, expense.currency)
+
+    # בדיקת תקינות 1: סכום האחראיות = הסכום הכללי
+    total_responsibility = sum_minor(_minor_amount(p.responsible_for, expense.currency) for p in expense.participants)
+    if total_responsibility != amount:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Sum of responsibilities ({from_minor(total_responsibility, expense.currency)}) must equal total amount ({expense.amount})"
+        )
+
+    # בדיקת תקינות 2: סכום התשלומים = הסכום הכללי
+    total_paid = sum_minor(_minor_amount(p.paid, expense.currency) for p in expense.participants)
+    if total_paid != amount:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Sum of payments ({from_minor(total_paid, expense.currency)}) must equal total amount ({expense.amount})"
+        )
+    return amount
+
+
+def _resolve_participants(members: List[dict], expense: FlexibleExpense) -> List[dict]:
+    """
+    Map expense participants to event members in one pass, reporting every non-member at once.
+    Amounts are stored in minor units - call _validate_amounts first.
+    """
+    member_ids = {m["email"]: m["user_id"] for m in members}
+
+    not_members = [p.email for p in expense.participants if p.email not in member_ids]
+    if not_members:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Users are not members of this event: {', '.join(dict.fromkeys(not_members))}"
+        )
+
+    return [
+        {
+            "user_id": member_ids[p.email],
+            "email": p.email,
+            "responsible_for": to_minor(p.responsible_for, expense.currency),
+            "paid": to_minor(p.paid, expense.currency)
+        }
+        for p in expense.participants
+    ]
+
+
+def _expense_oid(expense_id: str) -> ObjectId:
+    """Parse the expense ID from the path (400 if it is not an ObjectId)"""
+    if not ObjectId.is_valid(expense_id):
+        raise HTTPException(status_code=400, detail="Invalid expense ID format")
+    return ObjectId(expense_id)
 
 @router.post("/", response_model=EventOut)
-def create_event(event: FlexibleEventCreate, current_user: dict = Depends(get_current_user)):
+async def create_event(event: FlexibleEventCreate, current_user: dict = Depends(get_current_user)):
     """יצירת אירוע גמיש - בלי מטבע קבוע כלל"""
     
     # יצירת האירוע בלי מטבע
@@ -29,36 +311,37 @@ def create_event(event: FlexibleEventCreate, current_user: dict = Depends(get_cu
         "base_currency": None,  # לא קובעים מטבע!
         "created_by": current_user["user_id"],
         "created_at": datetime.utcnow(),
-        "expenses": [],
         "members": [],
+        "expenses_count": 0,  # נשמר כדי ש-/my-events לא יצטרך לספור הוצאות
+        "version": 0,  # עולה בכל שינוי - משמש ל-ETag
+        "money_units": MONEY_UNITS,  # כל הסכומים ביחידות מינימליות (סנטים) כמספרים שלמים
         "currency_balances": {},  # יתרות לפי מטבעות: {"USD": {"user1": 10}, "EUR": {"user2": -5}}
         "total_expenses_by_currency": {}  # סכומים לפי מטבע: {"USD": 100, "EUR": 50}
     }
 
-    # 1. הוספת המשתמש שיוצר האירוע
-    creator = users_collection.find_one({"_id": ObjectId(current_user["user_id"])})
+    event_dict["last_activity_at"] = event_dict["created_at"]
+
+    # 1+2. המשתמש שיוצר האירוע וכל המוזמנים - בשאילתה אחת
+    invited_emails = list(dict.fromkeys(member["email"] for member in event.members))
+    users_by_email, creator = await _find_users_by_email(invited_emails, current_user["user_id"])
     if not creator:
         raise HTTPException(status_code=404, detail="Creator user not found")
-        
+
+    missing = [email for email in invited_emails if email not in users_by_email]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Users not found: {', '.join(missing)}")
+
     event_dict["members"].append({
         "user_id": current_user["user_id"],
         "email": creator["email"]
     })
-
-    # 2. הוספת משתמשים נוספים
-    for member in event.members:
-        user = users_collection.find_one({"email": member["email"]})
-        if not user:
-            raise HTTPException(status_code=404, detail=f"User {member['email']} not found")
-
-        if str(user["_id"]) != current_user["user_id"]:
-            event_dict["members"].append({
-                "user_id": str(user["_id"]),
-                "email": user["email"]
-            })
+    for email in invited_emails:
+        user_id = str(users_by_email[email]["_id"])
+        if user_id != current_user["user_id"]:
+            event_dict["members"].append({"user_id": user_id, "email": email})
 
     try:
-        result = events_collection.insert_one(event_dict)
+        result = await events_collection.insert_one(event_dict)
         event_dict["_id"] = str(result.inserted_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
@@ -75,12 +358,20 @@ def create_event(event: FlexibleEventCreate, current_user: dict = Depends(get_cu
         total_expenses=0.0
     )
 
-@router.post("/{event_id}/expenses", response_model=EventOut)
-def add_flexible_expense(event_id: str, expense: FlexibleExpense, current_user: dict = Depends(get_current_user)):
-    """הוספת הוצאה מתקדמת - מי שילם בפועל VS מי אחראי על מה"""
+@router.post("/{event_id}/expenses", response_model=Union[EventOut, ExpenseMutationOut])
+async def add_flexible_expense(
+    event_id: str,
+    expense: FlexibleExpense,
+    return_mode: str = Query("representation", alias="return", pattern="^(representation|minimal)$"),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    הוספת הוצאה מתקדמת - מי שילם בפועל VS מי אחראי על מה
+    return=minimal: only the new expense, the changed balances and the new version
+    """
     
     try:
-        event = events_collection.find_one({"_id": ObjectId(event_id)})
+        event = await events_collection.find_one({"_id": ObjectId(event_id)}, {"members": 1})
     except:
         raise HTTPException(status_code=400, detail="Invalid ID format")
 
@@ -91,288 +382,268 @@ def add_flexible_expense(event_id: str, expense: FlexibleExpense, current_user:
     if current_user["user_id"] not in [m["user_id"] for m in event["members"]]:
         raise HTTPException(status_code=403, detail="You are not a member of this event")
 
-    # בדיקת תקינות 1: סכום האחראיות = הסכום הכללי
-    total_responsibility = sum(p.responsible_for for p in expense.participants)
-    if abs(total_responsibility - expense.amount) > 0.01:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Sum of responsibilities ({total_responsibility}) must equal total amount ({expense.amount})"
-        )
-    
-    # בדיקת תקינות 2: סכום התשלומים = הסכום הכללי
-    total_paid = sum(p.paid for p in expense.participants)
-    if abs(total_paid - expense.amount) > 0.01:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Sum of payments ({total_paid}) must equal total amount ({expense.amount})"
-        )
+    # בדיקות תקינות: אחראיות ותשלומים מסתכמים בדיוק לסכום הכללי
+    amount = _validate_amounts(expense)
 
     # המרת אימיילים ל-user_ids ובדיקת חברות
-    participant_data = []
-    event_member_emails = {m["email"]: m["user_id"] for m in event["members"]}
-    
-    current_user_included = False
-    for participant in expense.participants:
-        if participant.email not in event_member_emails:
-            raise HTTPException(status_code=400, detail=f"User {participant.email} is not a member of this event")
-        
-        user_id = event_member_emails[participant.email]
-        participant_data.append({
-            "user_id": user_id,
-            "email": participant.email,
-            "responsible_for": participant.responsible_for,
-            "paid": participant.paid
-        })
-        
-        if user_id == current_user["user_id"]:
-            current_user_included = True
-
-    if not current_user_included:
-        raise HTTPException(status_code=400, detail="You must include yourself in the participants list")
+    participant_data = _resolve_participants(event["members"], expense)
 
-    # עדכון יתרות לפי מטבע
-    if "currency_balances" not in event:
-        event["currency_balances"] = {}
-    
-    if expense.currency not in event["currency_balances"]:
-        event["currency_balances"][expense.currency] = {}
-
-    # חישוב ועדכון יתרות
-    for participant in participant_data:
-        user_id = participant["user_id"]
-        responsible_for = participant["responsible_for"]
-        paid = participant["paid"]
-        
-        if user_id not in event["currency_balances"][expense.currency]:
-            event["currency_balances"][expense.currency][user_id] = 0.0
-        
-        # יתרה = מה ששילם - מה שהוא אחראי עליו
-        balance_change = paid - responsible_for
-        event["currency_balances"][expense.currency][user_id] += balance_change
-
-    # עדכון סך הוצאות לפי מטבע
-    if "total_expenses_by_currency" not in event:
-        event["total_expenses_by_currency"] = {}
-    
-    if expense.currency not in event["total_expenses_by_currency"]:
-        event["total_expenses_by_currency"][expense.currency] = 0.0
-    
-    event["total_expenses_by_currency"][expense.currency] += expense.amount
+    if current_user["user_id"] not in {p["user_id"] for p in participant_data}:
+        raise HTTPException(status_code=400, detail="You must include yourself in the participants list")
 
-    # הוספת ההוצאה עם כל המידע
+    # הוספת ההוצאה עם כל המידע - למסמך משלה באוסף expenses
     expense_record = {
+        "event_id": event["_id"],
         "created_by": current_user["user_id"],
-        "amount": expense.amount,
+        "amount": amount,
         "currency": expense.currency,
         "participants": participant_data,
         "note": expense.note,
         "expense_type": "advanced",
+        "money_units": MONEY_UNITS,
         "created_at": datetime.utcnow()
     }
-    
-    event["expenses"].append(expense_record)
-
-    # עדכון המסד נתונים
-    events_collection.update_one(
-        {"_id": ObjectId(event_id)},
-        {"$set": {
-            "currency_balances": event["currency_balances"],
-            "total_expenses_by_currency": event["total_expenses_by_currency"],
-            "expenses": event["expenses"]
-        }}
-    )
 
-    # החזרת האירוע המעודכן
-    event["_id"] = str(event["_id"])
-    
-    expenses_out = []
-    for exp in event["expenses"]:
-        participants_for_output = []
-        for p in exp["participants"]:
-            if "paid" in p and "responsible_for" in p:
-                participants_for_output.append({
-                    "user_id": p["user_id"],
-                    "share": p["paid"],
-                    "responsible_for": p["responsible_for"],
-                    "paid": p["paid"]
-                })
-            elif "share" in p:
-                participants_for_output.append({
-                    "user_id": p["user_id"],
-                    "share": p["share"]
-                })
-            else:
-                participants_for_output.append({
-                    "user_id": p.get("user_id", ""),
-                    "share": 0.0
-                })
-        
-        expenses_out.append(ExpenseOut(
-            payer_id=exp.get("created_by", exp.get("payer_id", "")),
-            amount=exp["amount"],
-            currency=exp["currency"],
-            amount_in_base_currency=exp["amount"],
-            participants=participants_for_output,
-            note=exp.get("note", ""),
-            exchange_rate=None,
-            created_at=exp["created_at"]
-        ))
-    
-    # Calculate balance for each member from all currencies
-    members_with_balance = []
-    for m in event["members"]:
-        user_id = m["user_id"]
-        total_balance = 0.0
-        
-        # Sum balances from all currencies
-        for currency, balances in event.get("currency_balances", {}).items():
-            user_balance = balances.get(user_id, 0.0)
-            total_balance += user_balance
-        
-        members_with_balance.append({
-            "user_id": user_id,
-            "email": m["email"],
-            "balance": total_balance
-        })
-    
-    return EventOut(
-        id=event["_id"],
-        name=event["name"],
-        base_currency="FLEXIBLE",
-        created_by=event["created_by"],
-        created_at=event["created_at"],
-        members=members_with_balance,
-        expenses=expenses_out,
-        total_expenses=0.0
+    await expenses_collection.insert_one(expense_record)
+
+    # עדכון אטומי בשרת: $inc ליתרות, לסכומים לפי מטבע ולמונה ההוצאות
+    increments = _expense_increments(expense_record)
+    event = await events_collection.find_one_and_update(
+        {"_id": event["_id"]},
+        {
+            "$inc": {**increments, "expenses_count": 1, "version": 1},
+            "$set": {"last_activity_at": expense_record["created_at"]}
+        },
+        return_document=ReturnDocument.AFTER
     )
+    if not event:
+        await expenses_collection.delete_one({"_id": expense_record["_id"]})
+        raise HTTPException(status_code=404, detail="Event not found")
+    settlement_previews.apply(str(event["_id"]), increments, event["version"])
 
+    if return_mode == "minimal":
+        return _mutation_result(event, expense_record, [expense_record])
 
-@router.get("/my-events")
-def get_my_events(current_user: dict = Depends(get_current_user)):
-    try:
-        user_id = current_user["user_id"]
-        conds = [
-            {"created_by": user_id},
-            {"members.user_id": user_id},
-        ]
+    # החזרת האירוע המעודכן
+    expenses, next_cursor = await _load_expense_page(event["_id"])
+    return _event_out(event, expenses, next_cursor)
 
-        # אם ה-user_id נראה כמו ObjectId תקף, נצרף תנאים גם ל-ObjectId
-        if ObjectId.is_valid(user_id):
-            user_oid = ObjectId(user_id)
-            conds.extend([
-                {"created_by": user_oid},
-                {"members.user_id": user_oid},
-            ])
-
-        events_cursor = events_collection.find({"$or": conds}).sort("created_at", -1)
-
-        events_list = []
-        for event in events_cursor:
-            events_list.append({
-                "id": str(event["_id"]),
-                "name": event.get("name", "Unknown"),
-                # הפוך ל-str אם יושב כ-ObjectId באירועים ישנים
-                "created_by": str(event.get("created_by")) if event.get("created_by") is not None else None,
-                "created_at": str(event.get("created_at")),
-                "members": event.get("members", []),
-                "expenses_count": len(event.get("expenses", [])),
-                # היזהר מערך None – אם יש סיכוי ל-None, אפשר לעשות or "FLEXIBLE"
-                "base_currency": (event.get("base_currency") or "FLEXIBLE"),
-            })
 
-        return {
-            "user_id": user_id,
-            "events_count": len(events_list),
-            "events": events_list
-        }
+@router.get("/my-events", response_model=MyEventsOut)
+async def get_my_events(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Dashboard listing of the user's events, newest first.
+    Reads only the listing fields - the stored expenses_count replaces counting expenses.
+    """
+    user_id = current_user["user_id"]
+    conds = [
+        {"created_by": user_id},
+        {"members.user_id": user_id},
+    ]
+
+    # אם ה-user_id נראה כמו ObjectId תקף, נצרף תנאים גם ל-ObjectId
+    if ObjectId.is_valid(user_id):
+        user_oid = ObjectId(user_id)
+        conds.extend([
+            {"created_by": user_oid},
+            {"members.user_id": user_oid},
+        ])
 
-    except Exception as e:
-        import traceback
-        return {
-            "error": str(e),
-            "traceback": traceback.format_exc()[:1000],
-            "user_id": current_user.get("user_id", "NO_USER_ID")
-        }
-    
+    try:
+        query = {"$and": [{"$or": conds}, after_cursor_filter(after)]} if after else {"$or": conds}
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    cursor = events_collection.find(query, EVENT_LIST_PROJECTION).sort(NEWEST_FIRST).limit(limit + 1)
+    events = [event async for event in cursor]
+
+    next_cursor = None
+    if len(events) > limit:
+        events = events[:limit]
+        next_cursor = encode_cursor(events[-1]["created_at"], events[-1]["_id"])
+
+    events_list = [
+        EventListItem(
+            id=str(event["_id"]),
+            name=event.get("name", "Unknown"),
+            # הפוך ל-str אם יושב כ-ObjectId באירועים ישנים
+            created_by=str(event.get("created_by")) if event.get("created_by") is not None else None,
+            created_at=event["created_at"],
+            members=event.get("members", []),
+            expenses_count=event.get("expenses_count", 0),
+            last_activity_at=event.get("last_activity_at", event["created_at"]),
+            # היזהר מערך None – אם יש סיכוי ל-None, אפשר לעשות or "FLEXIBLE"
+            base_currency=(event.get("base_currency") or "FLEXIBLE"),
+        )
+        for event in events
+    ]
+
+    return MyEventsOut(
+        user_id=user_id,
+        events_count=len(events_list),
+        events=events_list,
+        next_cursor=next_cursor
+    )
 
 
 @router.get("/{event_id}", response_model=EventOut)
-def get_event(event_id: str, current_user: dict = Depends(get_current_user)):
+async def get_event(
+    event_id: str,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    summary: bool = False,
+    if_none_match: Optional[str] = Header(None),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Event with its latest expenses, newest first.
+    - limit / after: page through the expenses with the returned next_cursor
+    - summary=true: members and balances only, no expenses are read
+    - ETag follows the event version and the view (limit, after, summary): If-None-Match gets a 304, and
+      unchanged views are served from the rendered-view cache
+    """
     try:
-        event = events_collection.find_one({"_id": ObjectId(event_id)})
+        event_oid = ObjectId(event_id)
+        current = await events_collection.find_one({"_id": event_oid}, {"version": 1})
     except:
         raise HTTPException(status_code=400, detail="Invalid ID format")
 
-    if not event:
+    if not current:
         raise HTTPException(status_code=404, detail="Event not found")
 
-    event["_id"] = str(event["_id"])
-
-    expenses_out = []
-    total_expenses = 0.0
-    for expense in event.get("expenses", []):
-        participants_for_output = []
-        for p in expense.get("participants", []):
-            if "paid" in p and "responsible_for" in p:
-                participants_for_output.append({
-                    "user_id": p["user_id"],
-                    "share": p["paid"],
-                    "responsible_for": p["responsible_for"],
-                    "paid": p["paid"]
-                })
-            elif "share" in p:
-                participants_for_output.append({"user_id": p["user_id"], "share": p["share"]})
-            else:
-                participants_for_output.append({"user_id": p.get("user_id", ""), "share": 0.0})
-
-        expenses_out.append(ExpenseOut(
-            payer_id=expense.get("created_by", expense.get("payer_id", "")),
-            amount=expense["amount"],
-            currency=expense["currency"],
-            amount_in_base_currency=expense["amount"],
-            participants=participants_for_output,
-            note=expense.get("note", ""),
-            exchange_rate=None,
-            created_at=expense.get("created_at", datetime.utcnow())
-        ))
-        total_expenses += expense["amount"]
-    base_currency = event.get("base_currency") or "FLEXIBLE"
-
-    # Calculate balance for each member from all currencies
-    members_with_balance = []
-    for m in event["members"]:
-        user_id = m["user_id"]
-        total_balance = 0.0
-        
-        # Sum balances from all currencies
-        for currency, balances in event.get("currency_balances", {}).items():
-            user_balance = balances.get(user_id, 0.0)
-            total_balance += user_balance
-        
-        members_with_balance.append({
-            "user_id": user_id,
-            "email": m["email"],
-            "balance": total_balance
-        })
-
-    return EventOut(
-        id=event["_id"],
-        name=event["name"],
-        base_currency=base_currency,
-        created_by=event["created_by"],
-        created_at=event["created_at"],
-        members=members_with_balance,
-        expenses=expenses_out,
-        total_expenses=total_expenses
-    )
+    version = current.get("version", 0)
+    view = (limit, after, summary)
+    etag = make_etag(event_id, version, view)
+    if etag_matches(if_none_match, etag):
+        event_view_cache.record_not_modified()
+        return Response(status_code=304, headers={"ETag": etag})
+
+    body = event_view_cache.get((event_id, version, *view))
+    if body is None:
+        event = await events_collection.find_one({"_id": event_oid}, EVENT_VIEW_PROJECTION)
+        if not event:
+            raise HTTPException(status_code=404, detail="Event not found")
+        rendered = await _render_event_view(event, limit, after, summary)
+        # A raw Response skips FastAPI's serialize_response, so time the dump here
+        with span("pydantic.serialize"):
+            body = rendered.model_dump_json().encode()
+        # Cache under the version of the document we actually rendered
+        version = event.get("version", 0)
+        etag = make_etag(event_id, version, view)
+        event_view_cache.put((event_id, version, *view), body)
+
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+
+async def _render_event_view(event: dict, limit: int, after: Optional[str], summary: bool) -> EventOut:
+    """Build the EventOut for get_event from the projected event document"""
+    expenses, next_cursor = [], None
+    if not summary:
+        try:
+            expenses, next_cursor = await _load_expense_page(event["_id"], limit, after)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    # Outside the expense page load, so its Mongo spans are not counted twice
+    with span("pydantic.serialize"):
+        return _event_out(event, expenses, next_cursor)
 
 
 @router.post("/{event_id}/finalize", response_model=EventSummary)
-def finalize_event(event_id: str, final_currency: str, current_user: dict = Depends(get_current_user)):
-    """סיום האירוע עם שערי חליפין אוטומטיים"""
+async def finalize_event(
+    event_id: str,
+    final_currency: str,
+    as_of: Optional[datetime] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    סיום האירוע עם שערי חליפין אוטומטיים
+    - rates come from the stored rate history as of as_of (default: now), so
+      finalizing again with the same as_of gives the same result
+    - the results are written only if the event is still at the version they were
+      computed from - a concurrent expense change makes us re-read and recompute
+    - the result is stored with the version it produced and the rates used: a repeat
+      call for an unchanged event, currency and rates returns it without recomputing
+    """
     
     try:
-        event = events_collection.find_one({"_id": ObjectId(event_id)})
+        event_oid = ObjectId(event_id)
+    except:
+        raise HTTPException(status_code=400, detail="Invalid ID format")
+
+    stored = await events_collection.find_one({"_id": event_oid}, SETTLEMENT_PROJECTION)
+    if not stored:
+        raise HTTPException(status_code=404, detail="Event not found")
+    if current_user["user_id"] not in [m["user_id"] for m in stored["members"]]:
+        raise HTTPException(status_code=403, detail="You are not a member of this event")
+
+    # Only after the checks: resolving current rates may record a live snapshot
+    snapshot, cross_rates, rates_key = await _rates_for(as_of)
+
+    # Nothing changed since the last finalize - answer from the stored result
+    settlement = stored.get("last_settlement") or {}
+    if (
+        settlement.get("version") == stored.get("version", 0)
+        and settlement.get("currency") == final_currency
+        and settlement.get("rates_key") == rates_key
+    ):
+        return _stored_summary(stored)
+
+    async def attempt() -> EventSummary:
+        event = await events_collection.find_one({"_id": event_oid})
+        if not event:
+            raise HTTPException(status_code=404, detail="Event not found")
+
+        if current_user["user_id"] not in [m["user_id"] for m in event["members"]]:
+            raise HTTPException(status_code=403, detail="You are not a member of this event")
+
+        with span("settlement.compute", currency=final_currency):
+            exchange_rates, final_balances, transfers, total_expenses = _settle(event, final_currency, cross_rates)
+        final_payments = [
+            {"from_user_id": debtor_id, "to_user_id": creditor_id, "amount": amount, "currency": final_currency}
+            for debtor_id, creditor_id, amount in transfers
+        ]
+        finalized_at = datetime.utcnow()
+
+        # שמירת התוצאות הסופיות
+        result = await events_collection.update_one(
+            version_filter(event),
+            {"$set": {
+                "base_currency": final_currency,
+                "final_balances": final_balances,
+                "final_payments": final_payments,
+                "exchange_rates_used": exchange_rates,
+                "exchange_rates_snapshot_id": snapshot.id if snapshot else None,
+                "exchange_rates_as_of": snapshot.as_of if snapshot else None,
+                "finalized_at": finalized_at,
+                # The version this write produces - still current means nothing changed since
+                "last_settlement": {
+                    "version": event.get("version", 0) + 1,
+                    "currency": final_currency,
+                    "rates_key": rates_key,
+                    "total_expenses": total_expenses,
+                    "computed_at": finalized_at
+                }
+            },
+             "$inc": {"version": 1}}
+        )
+        if result.matched_count == 0:
+            await _raise_version_conflict(event_oid)
+        settlement_previews.advance(str(event["_id"]), event.get("version", 0) + 1)
+        return _summary(event, final_currency, final_balances, final_payments, total_expenses)
+
+    return await with_version_retry("finalize_event", attempt)
+
+
+@router.get("/{event_id}/finalize", response_model=EventSummary)
+async def get_last_settlement(event_id: str, current_user: dict = Depends(get_current_user)):
+    """The stored result of the last finalize (may be older than the event's latest changes)"""
+    try:
+        event = await events_collection.find_one({"_id": ObjectId(event_id)}, SETTLEMENT_PROJECTION)
     except:
         raise HTTPException(status_code=400, detail="Invalid ID format")
 
@@ -382,118 +653,178 @@ def finalize_event(event_id: str, final_currency: str, current_user: dict = Depe
     if current_user["user_id"] not in [m["user_id"] for m in event["members"]]:
         raise HTTPException(status_code=403, detail="You are not a member of this event")
 
-    # קבלת שערים אוטומטית
+    if not event.get("last_settlement"):
+        raise HTTPException(status_code=404, detail="Event has not been finalized")
+    return _stored_summary(event)
+
+
+@router.get("/{event_id}/settlement", response_model=SettlementPreviewOut)
+async def get_settlement_preview(
+    event_id: str,
+    currency: str = Query(..., min_length=2, max_length=4),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Who would pay whom if the event were finalized now in currency - a dry run.
+    The preview is kept up to date by the expense writes, so a read is normally a
+    version check; it is rebuilt from the stored balances only after a miss.
+    """
+    currency = currency.strip().upper()
     try:
-        current_rates = exchange_service.get_rates()
-        print(f"Got rates: {current_rates}")
-        
-        # חישוב שערי המרה לפי המטבע הסופי הנבחר
-        exchange_rates = {}
-        
-        for currency in event.get("total_expenses_by_currency", {}).keys():
-            if currency != final_currency:
-                if final_currency == "USD":
-                    # המרה למטבע היעד USD
-                    if currency in current_rates:
-                        exchange_rates[currency] = 1 / current_rates[currency]
-                    else:
-                        raise HTTPException(status_code=400, detail=f"Currency {currency} not supported")
-                        
-                elif currency == "USD":
-                    # המרה מ-USD למטבע היעד
-                    if final_currency in current_rates:
-                        exchange_rates[currency] = current_rates[final_currency]
-                    else:
-                        raise HTTPException(status_code=400, detail=f"Target currency {final_currency} not supported")
-                        
-                else:
-                    # המרה בין שני מטבעות זרים דרך USD
-                    if currency in current_rates and final_currency in current_rates:
-                        usd_rate = 1 / current_rates[currency]
-                        target_rate = current_rates[final_currency]
-                        exchange_rates[currency] = usd_rate * target_rate
-                    else:
-                        raise HTTPException(status_code=400, detail=f"Currency conversion not supported: {currency} -> {final_currency}")
-        
-        print(f"Calculated exchange rates: {exchange_rates}")
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to get exchange rates: {str(e)}")
-
-    # חישוב יתרות סופיות במטבע הנבחר
-    final_balances = {}
-    total_expenses_final = 0.0
-
-    # איתחול יתרות
-    for member in event["members"]:
-        final_balances[member["user_id"]] = 0.0
-
-    # המרת יתרות מכל מטבע למטבע הסופי
-    for currency, balances in event.get("currency_balances", {}).items():
-        rate = 1.0  # אם זה אותו מטבע
-        
-        if currency != final_currency:
-            if currency not in exchange_rates:
-                raise HTTPException(
-                    status_code=400, 
-                    detail=f"Missing exchange rate for {currency} to {final_currency}"
-                )
-            rate = exchange_rates[currency]
-
-        for user_id, balance in balances.items():
-            converted_balance = balance * rate
-            final_balances[user_id] += converted_balance
+        event_oid = ObjectId(event_id)
+        current = await events_collection.find_one({"_id": event_oid}, {"name": 1, "members": 1, "version": 1})
+    except:
+        raise HTTPException(status_code=400, detail="Invalid ID format")
 
-    # חישוב סך הוצאות במטבע הסופי
-    for currency, total in event.get("total_expenses_by_currency", {}).items():
-        rate = 1.0 if currency == final_currency else exchange_rates.get(currency, 1.0)
-        total_expenses_final += total * rate
+    if not current:
+        raise HTTPException(status_code=404, detail="Event not found")
 
-    # חישוב תשלומים נדרשים
-    payments = []
-    debtors = [(uid, abs(balance)) for uid, balance in final_balances.items() if balance < -0.01]
-    creditors = [(uid, balance) for uid, balance in final_balances.items() if balance > 0.01]
-    
-    for debtor_id, debt in debtors:
-        for creditor_id, credit in creditors:
-            if debt > 0.01 and credit > 0.01:
-                payment_amount = min(debt, credit)
-                payments.append(Payment(
-                    from_user_id=debtor_id,
-                    to_user_id=creditor_id,
-                    amount=round(payment_amount, 2),
-                    currency=final_currency
-                ))
-                debt -= payment_amount
-                credit -= payment_amount
-
-    # שמירת התוצאות הסופיות
-    events_collection.update_one(
-        {"_id": ObjectId(event_id)},
-        {"$set": {
-            "base_currency": final_currency,
-            "final_balances": final_balances,
-            "final_payments": [p.dict() for p in payments],
-            "exchange_rates_used": exchange_rates,
-            "finalized_at": datetime.utcnow()
-        }}
+    if current_user["user_id"] not in [m["user_id"] for m in current["members"]]:
+        raise HTTPException(status_code=403, detail="You are not a member of this event")
+
+    _, cross_rates, rates_key = await _rates_for(None)
+    if currency not in cross_rates:
+        raise HTTPException(status_code=400, detail=f"Target currency {currency} not supported")
+
+    key = str(event_oid)
+    preview = settlement_previews.get(key, currency, current.get("version", 0), rates_key)
+    if preview is None:
+        event = await events_collection.find_one({"_id": event_oid}, EVENT_VIEW_PROJECTION)
+        if not event:
+            raise HTTPException(status_code=404, detail="Event not found")
+        try:
+            preview = SettlementPreview.build(event, currency, rates_key, cross_rates)
+        except KeyError as e:
+            raise HTTPException(status_code=400, detail=f"Currency conversion not supported: {e.args[0]} -> {currency}")
+        settlement_previews.put(key, preview)
+
+    balances, transfers, total = preview.plan()
+    return SettlementPreviewOut(
+        event_id=key,
+        event_name=current["name"],
+        currency=currency,
+        version=preview.version,
+        member_balances={user_id: from_minor(balance, currency) for user_id, balance in balances.items()},
+        payments_needed=[
+            Payment(from_user_id=debtor_id, to_user_id=creditor_id, amount=from_minor(amount, currency), currency=currency)
+            for debtor_id, creditor_id, amount in transfers
+        ],
+        total_expenses=from_minor(total, currency),
+        rates_key=rates_key
+    )
+
+
+async def _rates_for(as_of: Optional[datetime]) -> Tuple[Optional[RateSnapshot], CrossRateMatrix, str]:
+    """
+    (snapshot, cross rates, rates key) in effect at as_of (default: now), from the
+    in-memory history index - never a network call. The key changes whenever the rates do.
+    """
+    if as_of is None:
+        await rate_history.capture_live()
+    snapshot = rate_history.rates_as_of(as_of or datetime.utcnow())
+    if snapshot is not None:
+        return snapshot, rate_history.cross_rates(snapshot), snapshot.id
+    if as_of is not None:
+        raise HTTPException(status_code=400, detail=f"No exchange rates stored as of {as_of.isoformat()}")
+    # History is still empty - live cache (or fallback) rates
+    return None, exchange_service.get_cross_rates(), _live_rates_key()
+
+
+def _live_rates_key() -> str:
+    """Identifies the live rates in use (no snapshot yet) - changes with every successful fetch"""
+    last_updated = exchange_service.last_updated
+    return f"live:{last_updated.isoformat()}" if last_updated else "live:fallback"
+
+
+def _stored_summary(event: dict) -> EventSummary:
+    """EventSummary rebuilt from the stored finalize result"""
+    settlement = event["last_settlement"]
+    return _summary(
+        event, settlement["currency"], event["final_balances"], event.get("final_payments", []),
+        settlement["total_expenses"]
     )
 
+
+def _summary(
+    event: dict,
+    currency: str,
+    balances: Dict[str, int],
+    payments: List[dict],
+    total_expenses: int
+) -> EventSummary:
+    """EventSummary from a settlement in minor units - the only place its amounts become floats"""
     return EventSummary(
         event_id=str(event["_id"]),
         event_name=event["name"],
-        base_currency=final_currency,
-        member_balances=final_balances,
-        payments_needed=payments,
-        total_expenses=round(total_expenses_final, 2)
+        base_currency=currency,
+        member_balances={user_id: from_minor(balance, currency) for user_id, balance in balances.items()},
+        payments_needed=[
+            Payment(**{**payment, "amount": from_minor(payment["amount"], payment["currency"])})
+            for payment in payments
+        ],
+        total_expenses=from_minor(total_expenses, currency)
+    )
+
+
+def _settle(
+    event: dict,
+    final_currency: str,
+    cross_rates: CrossRateMatrix
+) -> Tuple[Dict[str, float], Dict[str, int], List[Transfer], int]:
+    """
+    Settlement of an event in final_currency, with rates from a cross-rate matrix.
+    Returns (exchange rates used, final balances, transfers, total expenses), amounts in minor units.
+    """
+    # שערי המרה למטבע הסופי - עמודה אחת ממטריצת השערים
+    if final_currency not in cross_rates:
+        raise HTTPException(status_code=400, detail=f"Target currency {final_currency} not supported")
+
+    currencies = [c for c in event.get("total_expenses_by_currency", {}) if c != final_currency]
+    exchange_rates = cross_rates.rates_into(final_currency, currencies)
+    unsupported = [c for c in currencies if c not in exchange_rates]
+    if unsupported:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Currency conversion not supported: {', '.join(unsupported)} -> {final_currency}"
+        )
+    logger.debug("Settling %s in %s", event["_id"], final_currency, extra={"exchange_rates": exchange_rates})
+
+    # חישוב יתרות סופיות במטבע הנבחר - מכפלת מטריצת היתרות בווקטור השערים
+    matrix = BalanceMatrix.from_event(event)
+    try:
+        rate_vector = matrix.rate_vector(exchange_rates, final_currency)
+    except KeyError as e:
+        raise HTTPException(
+            status_code=400, 
+            detail=f"Missing exchange rate for {e.args[0]} to {final_currency}"
+        )
+    final_balances = matrix.as_dict(matrix.convert(rate_vector, final_currency))
+
+    # חישוב סך הוצאות במטבע הסופי
+    total_expenses_final = convert_totals(
+        event.get("total_expenses_by_currency", {}), exchange_rates, final_currency
     )
 
+    # חישוב תשלומים נדרשים
+    # Balances are exact integers that sum to zero - nothing to tolerate
+    transfers = plan_payments(final_balances, tolerance=0)
+    return exchange_rates, final_balances, transfers, total_expenses_final
+
+
+async def _raise_version_conflict(event_oid: ObjectId):
+    """A versioned write matched nothing: 404 if the event is gone, else VersionConflict with its version"""
+    current = await events_collection.find_one({"_id": event_oid}, {"version": 1})
+    if not current:
+        raise HTTPException(status_code=404, detail="Event not found")
+    raise VersionConflict(current.get("version", 0))
+
+
 @router.delete("/{event_id}")
-def delete_event(event_id: str, current_user: dict = Depends(get_current_user)):
+async def delete_event(event_id: str, current_user: dict = Depends(get_current_user)):
     """Delete an event if the current user is the creator"""
     
     try:
-        event = events_collection.find_one({"_id": ObjectId(event_id)})
+        event = await events_collection.find_one({"_id": ObjectId(event_id)})
     except:
         raise HTTPException(status_code=400, detail="Invalid ID format")
 
@@ -503,21 +834,24 @@ def delete_event(event_id: str, current_user: dict = Depends(get_current_user)):
     if event["created_by"] != current_user["user_id"]:
         raise HTTPException(status_code=403, detail="Only the creator can delete this event")
 
-    events_collection.delete_one({"_id": ObjectId(event_id)})
+    await events_collection.delete_one({"_id": ObjectId(event_id)})
+    await expenses_collection.delete_many({"event_id": ObjectId(event_id)})
 
     return {"message": "Event deleted successfully", "event_id": event_id}
 
 
-@router.delete("/{event_id}/expenses/{expense_index}")
-def delete_expense(
+@router.delete("/{event_id}/expenses/{expense_id}")
+async def delete_expense(
     event_id: str, 
-    expense_index: int, 
+    expense_id: str, 
     current_user: dict = Depends(get_current_user)
 ):
-    """Delete an expense and reverse its balance changes"""
+    """Delete an expense by its ID and reverse its balance changes"""
     
+    expense_oid = _expense_oid(expense_id)
+
     try:
-        event = events_collection.find_one({"_id": ObjectId(event_id)})
+        event = await events_collection.find_one({"_id": ObjectId(event_id)}, {"members": 1})
     except:
         raise HTTPException(status_code=400, detail="Invalid ID format")
 
@@ -528,66 +862,47 @@ def delete_expense(
     if current_user["user_id"] not in [m["user_id"] for m in event["members"]]:
         raise HTTPException(status_code=403, detail="You are not a member of this event")
 
-    # Check expense exists
-    if expense_index < 0 or expense_index >= len(event.get("expenses", [])):
+    # One atomic write removes the expense and hands back what it held - only the
+    # request that actually removed it reverses its balances
+    expense = await expenses_collection.find_one_and_delete({"_id": expense_oid, "event_id": event["_id"]})
+    if not expense:
         raise HTTPException(status_code=404, detail="Expense not found")
 
-    expense = event["expenses"][expense_index]
-
-    # Reverse the balance changes
-    currency = expense["currency"]
-    
-    if "currency_balances" in event and currency in event["currency_balances"]:
-        for participant in expense.get("participants", []):
-            user_id = participant["user_id"]
-            
-            # Reverse the balance change
-            if "paid" in participant and "responsible_for" in participant:
-                # Advanced expense
-                balance_change = participant["paid"] - participant["responsible_for"]
-                if user_id in event["currency_balances"][currency]:
-                    event["currency_balances"][currency][user_id] -= balance_change
-            elif "share" in participant:
-                # Old-style expense - might need different logic
-                pass
-
-    # Reverse total expenses
-    if "total_expenses_by_currency" in event and currency in event["total_expenses_by_currency"]:
-        event["total_expenses_by_currency"][currency] -= expense["amount"]
-        
-        # Remove currency if total is zero
-        if abs(event["total_expenses_by_currency"][currency]) < 0.01:
-            del event["total_expenses_by_currency"][currency]
-            if currency in event.get("currency_balances", {}):
-                del event["currency_balances"][currency]
-
-    # Remove the expense
-    event["expenses"].pop(expense_index)
-
-    # Update database
-    events_collection.update_one(
-        {"_id": ObjectId(event_id)},
-        {"$set": {
-            "currency_balances": event.get("currency_balances", {}),
-            "total_expenses_by_currency": event.get("total_expenses_by_currency", {}),
-            "expenses": event["expenses"]
-        }}
+    increments = _expense_increments(expense, sign=-1)
+    updated = await events_collection.find_one_and_update(
+        {"_id": event["_id"]},
+        {
+            "$inc": {**increments, "expenses_count": -1, "version": 1},
+            "$set": {"last_activity_at": datetime.utcnow()}
+        },
+        projection={"version": 1},
+        return_document=ReturnDocument.AFTER
     )
+    if updated:
+        settlement_previews.apply(str(event["_id"]), increments, updated["version"])
+
+    await _drop_empty_currency(event["_id"], expense["currency"])
 
-    return {"message": "Expense deleted successfully", "expense_index": expense_index}
+    return {"message": "Expense deleted successfully", "expense_id": expense_id}
 
 
-@router.put("/{event_id}/expenses/{expense_index}", response_model=EventOut)
-def update_expense(
+@router.put("/{event_id}/expenses/{expense_id}", response_model=Union[EventOut, ExpenseMutationOut])
+async def update_expense(
     event_id: str,
-    expense_index: int,
+    expense_id: str,
     expense: FlexibleExpense,
+    return_mode: str = Query("representation", alias="return", pattern="^(representation|minimal)$"),
     current_user: dict = Depends(get_current_user)
 ):
-    """Update an expense - reverses old calculations and applies new ones"""
+    """
+    Update an expense by its ID - reverses old calculations and applies new ones
+    return=minimal: only the updated expense, the changed balances and the new version
+    """
     
+    expense_oid = _expense_oid(expense_id)
+
     try:
-        event = events_collection.find_one({"_id": ObjectId(event_id)})
+        event = await events_collection.find_one({"_id": ObjectId(event_id)}, {"members": 1})
     except:
         raise HTTPException(status_code=400, detail="Invalid ID format")
 
@@ -598,178 +913,60 @@ def update_expense(
     if current_user["user_id"] not in [m["user_id"] for m in event["members"]]:
         raise HTTPException(status_code=403, detail="You are not a member of this event")
 
-    # Check expense exists
-    if expense_index < 0 or expense_index >= len(event.get("expenses", [])):
-        raise HTTPException(status_code=404, detail="Expense not found")
-
-    old_expense = event["expenses"][expense_index]
-
     # Validate new expense
-    total_responsibility = sum(p.responsible_for for p in expense.participants)
-    if abs(total_responsibility - expense.amount) > 0.01:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Sum of responsibilities ({total_responsibility}) must equal total amount ({expense.amount})"
-        )
-    
-    total_paid = sum(p.paid for p in expense.participants)
-    if abs(total_paid - expense.amount) > 0.01:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Sum of payments ({total_paid}) must equal total amount ({expense.amount})"
-        )
+    amount = _validate_amounts(expense)
 
     # Convert emails to user_ids
-    participant_data = []
-    event_member_emails = {m["email"]: m["user_id"] for m in event["members"]}
-    
-    for participant in expense.participants:
-        if participant.email not in event_member_emails:
-            raise HTTPException(status_code=400, detail=f"User {participant.email} is not a member of this event")
-        
-        user_id = event_member_emails[participant.email]
-        participant_data.append({
-            "user_id": user_id,
-            "email": participant.email,
-            "responsible_for": participant.responsible_for,
-            "paid": participant.paid
-        })
-
-    # Initialize if needed
-    if "currency_balances" not in event:
-        event["currency_balances"] = {}
-    if "total_expenses_by_currency" not in event:
-        event["total_expenses_by_currency"] = {}
-
-    # STEP 1: Reverse old expense calculations
-    old_currency = old_expense["currency"]
-    
-    if old_currency in event["currency_balances"]:
-        for participant in old_expense.get("participants", []):
-            user_id = participant["user_id"]
-            if "paid" in participant and "responsible_for" in participant:
-                balance_change = participant["paid"] - participant["responsible_for"]
-                if user_id in event["currency_balances"][old_currency]:
-                    event["currency_balances"][old_currency][user_id] -= balance_change
-
-    if old_currency in event["total_expenses_by_currency"]:
-        event["total_expenses_by_currency"][old_currency] -= old_expense["amount"]
-        
-        # Clean up if zero
-        if abs(event["total_expenses_by_currency"][old_currency]) < 0.01:
-            del event["total_expenses_by_currency"][old_currency]
-            if old_currency in event["currency_balances"]:
-                # Check if all balances are zero
-                all_zero = all(abs(b) < 0.01 for b in event["currency_balances"][old_currency].values())
-                if all_zero:
-                    del event["currency_balances"][old_currency]
-
-    # STEP 2: Apply new expense calculations
-    new_currency = expense.currency
-    
-    if new_currency not in event["currency_balances"]:
-        event["currency_balances"][new_currency] = {}
-
-    for participant in participant_data:
-        user_id = participant["user_id"]
-        responsible_for = participant["responsible_for"]
-        paid = participant["paid"]
-        
-        if user_id not in event["currency_balances"][new_currency]:
-            event["currency_balances"][new_currency][user_id] = 0.0
-        
-        balance_change = paid - responsible_for
-        event["currency_balances"][new_currency][user_id] += balance_change
-
-    if new_currency not in event["total_expenses_by_currency"]:
-        event["total_expenses_by_currency"][new_currency] = 0.0
-    
-    event["total_expenses_by_currency"][new_currency] += expense.amount
+    participant_data = _resolve_participants(event["members"], expense)
 
-    # STEP 3: Update the expense record
-    expense_record = {
-        "created_by": old_expense.get("created_by", current_user["user_id"]),
-        "amount": expense.amount,
+    changes = {
+        "amount": amount,
         "currency": expense.currency,
         "participants": participant_data,
         "note": expense.note,
         "expense_type": "advanced",
-        "created_at": old_expense.get("created_at", datetime.utcnow()),
+        "money_units": MONEY_UNITS,
         "updated_at": datetime.utcnow()
     }
-    
-    event["expenses"][expense_index] = expense_record
-
-    # Update database
-    events_collection.update_one(
-        {"_id": ObjectId(event_id)},
-        {"$set": {
-            "currency_balances": event["currency_balances"],
-            "total_expenses_by_currency": event["total_expenses_by_currency"],
-            "expenses": event["expenses"]
-        }}
-    )
 
- # Return updated event
-    event["_id"] = str(event["_id"])
-    
-    expenses_out = []
-    for exp in event["expenses"]:
-        participants_for_output = []
-        for p in exp["participants"]:
-            if "paid" in p and "responsible_for" in p:
-                participants_for_output.append({
-                    "user_id": p["user_id"],
-                    "share": p["paid"],
-                    "responsible_for": p["responsible_for"],
-                    "paid": p["paid"]
-                })
-            elif "share" in p:
-                participants_for_output.append({
-                    "user_id": p["user_id"],
-                    "share": p["share"]
-                })
-            else:
-                participants_for_output.append({
-                    "user_id": p.get("user_id", ""),
-                    "share": 0.0
-                })
-        
-        expenses_out.append(ExpenseOut(
-            payer_id=exp.get("created_by", exp.get("payer_id", "")),
-            amount=exp["amount"],
-            currency=exp["currency"],
-            amount_in_base_currency=exp["amount"],
-            participants=participants_for_output,
-            note=exp.get("note", ""),
-            exchange_rate=None,
-            created_at=exp["created_at"]
-        ))
-    
-    # Calculate balance for each member from all currencies
-    members_with_balance = []
-    for m in event["members"]:
-        user_id = m["user_id"]
-        total_balance = 0.0
-        
-        # Sum balances from all currencies
-        for currency, balances in event.get("currency_balances", {}).items():
-            user_balance = balances.get(user_id, 0.0)
-            total_balance += user_balance
-        
-        members_with_balance.append({
-            "user_id": user_id,
-            "email": m["email"],
-            "balance": total_balance
-        })
-    
-    return EventOut(
-        id=event["_id"],
-        name=event["name"],
-        base_currency="FLEXIBLE",
-        created_by=event["created_by"],
-        created_at=event["created_at"],
-        members=members_with_balance,
-        expenses=expenses_out,
-        total_expenses=0.0
-    )
\ No newline at end of file
+    # One atomic write replaces the fields and returns the previous version of the
+    # expense - concurrent edits each reverse exactly what they replaced
+    old_expense = await expenses_collection.find_one_and_update(
+        {"_id": expense_oid, "event_id": event["_id"]},
+        {"$set": changes},
+        return_document=ReturnDocument.BEFORE
+    )
+    if not old_expense:
+        raise HTTPException(status_code=404, detail="Expense not found")
+    expense_record = {**old_expense, **changes}
+
+    # Reverse the old expense and apply the new one in a single atomic update
+    increments = _merge_increments(_expense_increments(old_expense, sign=-1), _expense_increments(expense_record))
+    event = await events_collection.find_one_and_update(
+        {"_id": event["_id"]},
+        {
+            "$inc": {**increments, "version": 1},
+            "$set": {"last_activity_at": expense_record["updated_at"]}
+        },
+        return_document=ReturnDocument.AFTER
+    )
+    if not event:
+        # The event was deleted meanwhile - put the expense back the way we found it
+        await expenses_collection.replace_one({"_id": expense_oid}, old_expense)
+        raise HTTPException(status_code=404, detail="Event not found")
+    settlement_previews.apply(str(event["_id"]), increments, event["version"])
+
+    if old_expense["currency"] != expense_record["currency"]:
+        dropped_version = await _drop_empty_currency(event["_id"], old_expense["currency"])
+        if dropped_version is not None:
+            # Only mirror the $unset in the response when it actually happened
+            event.get("total_expenses_by_currency", {}).pop(old_expense["currency"], None)
+            event.get("currency_balances", {}).pop(old_expense["currency"], None)
+            event["version"] = dropped_version
+
+    if return_mode == "minimal":
+        return _mutation_result(event, expense_record, [old_expense, expense_record])
+
+    # Return updated event
+    expenses, next_cursor = await _load_expense_page(event["_id"])
+    return _event_out(event, expenses, next_cursor)
@@ -3,8 +3,10 @@ from fastapi import APIRouter, HTTPException, Depends
 from app.models.user import UserCreate, UserLogin, UserOut
 from app.services.db import db
 from datetime import datetime
-from app.services.auth import create_access_token, get_current_user
+from app.services.auth import create_access_token, get_current_user, revoke_token, security
+from fastapi.security import HTTPAuthorizationCredentials
 from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
 from typing import List
 import hashlib
 import secrets
@@ -29,9 +31,9 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
         return False
 
 @router.post("/register", response_model=UserOut)
-def register(user: UserCreate):
+async def register(user: UserCreate):
     # בדיקה אם המשתמש קיים
-    if users_collection.find_one({"email": user.email}):
+    if await users_collection.find_one({"email": user.email}):
         raise HTTPException(status_code=400, detail="Email already registered")
 
     # Hash password
@@ -44,7 +46,11 @@ def register(user: UserCreate):
         "created_at": datetime.utcnow()
     }
     
-    result = users_collection.insert_one(user_dict)
+    try:
+        result = await users_collection.insert_one(user_dict)
+    except DuplicateKeyError:
+        # Lost a race with another registration - the unique email index caught it
+        raise HTTPException(status_code=400, detail="Email already registered")
     
     return UserOut(
         id=str(result.inserted_id),
@@ -54,9 +60,9 @@ def register(user: UserCreate):
     )
 
 @router.post("/login")
-def login(user: UserLogin):
+async def login(user: UserLogin):
     # מצא משתמש
-    db_user = users_collection.find_one({"email": user.email})
+    db_user = await users_collection.find_one({"email": user.email})
     
     # בדוק סיסמה
     if not db_user or not verify_password(user.password, db_user["password_hash"]):
@@ -69,11 +75,20 @@ def login(user: UserLogin):
     
     return {"access_token": token, "token_type": "bearer"}
 
+@router.post("/logout")
+async def logout(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    current_user: dict = Depends(get_current_user)
+):
+    """ביטול ה-token הנוכחי - בקשות הבאות איתו יידחו"""
+    revoke_token(credentials.credentials)
+    return {"message": "Logged out successfully"}
+
 @router.get("/me", response_model=UserOut)
-def get_current_user_info(current_user: dict = Depends(get_current_user)):
+async def get_current_user_info(current_user: dict = Depends(get_current_user)):
     """קבלת פרטי המשתמש המחובר"""
     try:
-        user = users_collection.find_one({"_id": ObjectId(current_user["user_id"])})
+        user = await users_collection.find_one({"_id": ObjectId(current_user["user_id"])})
     except:
         raise HTTPException(status_code=400, detail="Invalid user ID")
     
@@ -88,10 +103,10 @@ def get_current_user_info(current_user: dict = Depends(get_current_user)):
     )
 
 @router.get("/", response_model=List[UserOut])
-def get_all_users(current_user: dict = Depends(get_current_user)):
+async def get_all_users(current_user: dict = Depends(get_current_user)):
     """קבלת כל המשתמשים (לבחירה באירועים)"""
     users = []
-    for user in users_collection.find({}, {"password_hash": 0}):  # בלי החזרת הסיסמה
+    async for user in users_collection.find({}, {"password_hash": 0}):  # בלי החזרת הסיסמה
         users.append(UserOut(
             id=str(user["_id"]),
             name=user["name"],
@@ -0,0 +1,41 @@
+# app/scripts/ensure_indexes.py
+# Creates the app's MongoDB indexes and reports queries that still scan a collection.
+#
+# Usage:
+#   python -m app.scripts.ensure_indexes           # create indexes, then verify
+#   python -m app.scripts.ensure_indexes --check   # only verify, create nothing
+#
+# Exits with status 1 if any query still plans as COLLSCAN.
+
+import argparse
+import asyncio
+import sys
+
+from app.services.db import ping_database
+from app.services.indexes import ensure_indexes, find_collscans
+
+
+async def run(check_only: bool = False) -> int:
+    await ping_database()
+
+    if not check_only:
+        names = await ensure_indexes()
+        print(f"[INDEXES] Ensured {len(names)} indexes: {', '.join(names)}")
+
+    collscans = await find_collscans()
+    for name in collscans:
+        print(f"[INDEXES] ⚠️ COLLSCAN: {name}")
+    if not collscans:
+        print("[INDEXES] ✅ Every checked query uses an index")
+    return 1 if collscans else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create and verify MongoDB indexes")
+    parser.add_argument("--check", action="store_true", help="only verify, do not create indexes")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(check_only=args.check)))
+
+
+if __name__ == "__main__":
+    main()
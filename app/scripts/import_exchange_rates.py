@@ -0,0 +1,94 @@
+# app/scripts/import_exchange_rates.py
+# Bulk-imports exchange-rate history into the exchange_rates collection.
+# Running API processes pick the new snapshots up on their next rate-history sync.
+#
+# Rates are units of currency per 1 USD, like the live rates. Accepted files:
+#   CSV  - header "date,currency,rate", one row per currency and date
+#   JSON - {"2024-01-31": {"EUR": 0.92, "ILS": 3.65}, ...}
+#          or [{"date": "2024-01-31", "rates": {"EUR": 0.92}}, ...]
+# Dates are ISO dates or datetimes in UTC.
+#
+# Usage:
+#   python -m app.scripts.import_exchange_rates rates.csv
+#   python -m app.scripts.import_exchange_rates rates.json --dry-run
+#
+# Safe to re-run: snapshots are upserted on their date.
+
+import argparse
+import asyncio
+import csv
+import json
+from datetime import datetime
+from typing import Dict
+
+from pymongo import UpdateOne
+
+from app.services.db import ping_database
+from app.services.indexes import ensure_indexes
+from app.services.rate_history import RATES_BASE_CURRENCY, rates_collection
+
+BATCH_SIZE = 1000
+
+
+def read_history(path: str) -> Dict[datetime, Dict[str, float]]:
+    """as_of -> {currency: rate} from a CSV or JSON file"""
+    history: Dict[datetime, Dict[str, float]] = {}
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".csv"):
+            for row in csv.DictReader(f):
+                as_of = datetime.fromisoformat(row["date"])
+                history.setdefault(as_of, {})[row["currency"].strip().upper()] = float(row["rate"])
+            return history
+
+        data = json.load(f)
+    entries = data.items() if isinstance(data, dict) else ((entry["date"], entry["rates"]) for entry in data)
+    for date, rates in entries:
+        history.setdefault(datetime.fromisoformat(date), {}).update(
+            {currency.upper(): float(rate) for currency, rate in rates.items()}
+        )
+    return history
+
+
+async def import_history(path: str, dry_run: bool = False) -> int:
+    history = read_history(path)
+    dates = sorted(history)
+    if not dates:
+        print(f"[RATES] Nothing to import from {path}")
+        return 0
+    span = f"{dates[0].date()} .. {dates[-1].date()}"
+    if dry_run:
+        print(f"[RATES] Would import {len(dates)} snapshots ({span}) from {path}")
+        return len(dates)
+
+    await ping_database()
+    await ensure_indexes()
+
+    recorded_at = datetime.utcnow()
+    upserted = modified = 0
+    for start in range(0, len(dates), BATCH_SIZE):
+        requests = [
+            UpdateOne(
+                {"base": RATES_BASE_CURRENCY, "as_of": as_of},
+                {"$set": {"rates": history[as_of], "source": "import", "recorded_at": recorded_at}},
+                upsert=True
+            )
+            for as_of in dates[start:start + BATCH_SIZE]
+        ]
+        result = await rates_collection.bulk_write(requests, ordered=False)
+        upserted += result.upserted_count
+        modified += result.modified_count
+
+    print(f"[RATES] Imported {len(dates)} snapshots ({span}): {upserted} new, {modified} updated")
+    return len(dates)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import exchange-rate history (CSV or JSON)")
+    parser.add_argument("path", help="rates file (.csv or .json)")
+    parser.add_argument("--dry-run", action="store_true", help="only parse and report, do not write")
+    args = parser.parse_args()
+    asyncio.run(import_history(args.path, dry_run=args.dry_run))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# app/scripts/migrate_expenses.py
+# Moves expenses embedded in events.expenses into the expenses collection, then
+# backfills the expenses_count / last_activity_at fields used by /my-events.
+#
+# Usage:
+#   python -m app.scripts.migrate_expenses            # migrate every event
+#   python -m app.scripts.migrate_expenses --dry-run  # only report what would move
+#
+# Safe to re-run: expenses copied by an interrupted run are replaced, and the
+# embedded array is removed only after its copy was written.
+
+import argparse
+import asyncio
+
+from app.services.db import db, ping_database
+from app.services.indexes import ensure_indexes
+
+events_collection = db["events"]
+expenses_collection = db["expenses"]
+
+
+def build_expense_docs(event: dict) -> list:
+    """Turn an event's embedded expenses into expense documents, keeping their order"""
+    docs = []
+    for index, expense in enumerate(event.get("expenses") or []):
+        doc = dict(expense)
+        doc["event_id"] = event["_id"]
+        # Very old expenses have no timestamp - keep them ordered at the event start
+        doc.setdefault("created_at", event.get("created_at"))
+        doc["legacy_index"] = index
+        docs.append(doc)
+    return docs
+
+
+async def migrate(dry_run: bool = False) -> int:
+    await ping_database()
+    await ensure_indexes()
+
+    migrated_events = 0
+    migrated_expenses = 0
+    cursor = events_collection.find(
+        {"expenses": {"$exists": True}},
+        {"expenses": 1, "created_at": 1}
+    )
+
+    async for event in cursor:
+        docs = build_expense_docs(event)
+        if dry_run:
+            print(f"[MIGRATE] Event {event['_id']}: {len(docs)} expenses would move")
+        else:
+            # Drop copies left by an earlier interrupted run before inserting again
+            await expenses_collection.delete_many({"event_id": event["_id"], "legacy_index": {"$exists": True}})
+            if docs:
+                await expenses_collection.insert_many(docs, ordered=True)
+            await events_collection.update_one({"_id": event["_id"]}, {"$unset": {"expenses": ""}})
+            print(f"[MIGRATE] Event {event['_id']}: moved {len(docs)} expenses")
+
+        migrated_events += 1
+        migrated_expenses += len(docs)
+
+    action = "would move" if dry_run else "moved"
+    print(f"[MIGRATE] Done: {action} {migrated_expenses} expenses from {migrated_events} events")
+
+    await backfill_counters(dry_run=dry_run)
+    return migrated_expenses
+
+
+async def backfill_counters(dry_run: bool = False) -> int:
+    """Set expenses_count and last_activity_at on events created before they were maintained"""
+    updated = 0
+    cursor = events_collection.find({"expenses_count": {"$exists": False}}, {"created_at": 1})
+
+    async for event in cursor:
+        pipeline = [
+            {"$match": {"event_id": event["_id"]}},
+            {"$group": {
+                "_id": None,
+                "count": {"$sum": 1},
+                "last_created": {"$max": "$created_at"},
+                "last_updated": {"$max": "$updated_at"}
+            }}
+        ]
+        stats = {"count": 0}
+        async for row in expenses_collection.aggregate(pipeline):
+            stats = row
+
+        activity = [t for t in (event.get("created_at"), stats.get("last_created"), stats.get("last_updated")) if t]
+        fields = {"expenses_count": stats["count"], "last_activity_at": max(activity) if activity else None}
+        if not dry_run:
+            await events_collection.update_one({"_id": event["_id"]}, {"$set": fields})
+        updated += 1
+
+    action = "would backfill" if dry_run else "backfilled"
+    print(f"[MIGRATE] Done: {action} counters on {updated} events")
+    return updated
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move embedded event expenses into the expenses collection")
+    parser.add_argument("--dry-run", action="store_true", help="only report, do not write")
+    args = parser.parse_args()
+    asyncio.run(migrate(dry_run=args.dry_run))
+
+
+if __name__ == "__main__":
+    main()
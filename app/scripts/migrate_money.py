@@ -0,0 +1,163 @@
+# app/scripts/migrate_money.py
+# Converts stored float amounts to integer minor units (see app/models/money.py):
+# 1. every expense: amount and participant paid / responsible_for / share, each field
+#    rounded by largest remainder so the participants still sum to exactly the amount
+# 2. every event: currency_balances and total_expenses_by_currency are rebuilt from
+#    its expenses with $sum (exact integer adds, so the old float drift is dropped),
+#    final_balances / final_payments are converted as stored
+#
+# Usage:
+#   python -m app.scripts.migrate_money            # convert everything
+#   python -m app.scripts.migrate_money --dry-run  # only report what would change
+#
+# Run with the API stopped, after app.scripts.migrate_expenses. Safe to re-run:
+# converted documents carry money_units: "minor" and are skipped.
+
+import argparse
+import asyncio
+from decimal import ROUND_FLOOR, Decimal
+from typing import List, Optional
+
+from app.models.money import MONEY_UNITS, currency_exponent, to_minor
+from app.services.db import db, ping_database
+
+events_collection = db["events"]
+expenses_collection = db["expenses"]
+
+NOT_CONVERTED = {"money_units": {"$ne": MONEY_UNITS}}
+
+
+# The old API accepted splits that summed to the amount within this much (major units)
+OLD_SUM_TOLERANCE = Decimal("0.01")
+
+
+def spread_minor(values: List[float], currency: str, total: int) -> Optional[List[int]]:
+    """
+    Round one expense's per-participant amounts to minor units so they sum to exactly
+    total (largest remainder). None if the stored values were not a valid split of the
+    amount to begin with - those are rounded one by one, as they were stored.
+    """
+    exponent = currency_exponent(currency)
+    scaled = [Decimal(str(value)).scaleb(exponent) for value in values]
+    if abs(sum(scaled) - total) > OLD_SUM_TOLERANCE.scaleb(exponent):
+        return None
+
+    floors = [int(value.to_integral_value(rounding=ROUND_FLOOR)) for value in scaled]
+    shortfall = total - sum(floors)
+    # Largest remainder first gets +1; if the values overshoot, smallest remainder gives 1 back
+    by_remainder = sorted(range(len(values)), key=lambda i: scaled[i] - floors[i], reverse=shortfall > 0)
+    for i in by_remainder[:abs(shortfall)]:
+        floors[i] += 1 if shortfall > 0 else -1
+    return floors
+
+
+def convert_expense(expense: dict) -> dict:
+    """
+    $set document for one expense, amounts rounded to the currency's minor unit.
+    paid / responsible_for (and share) are rounded together so each still sums to the amount.
+    """
+    currency = expense["currency"]
+    amount = to_minor(expense["amount"], currency, strict=False)
+    participants = [dict(participant) for participant in expense.get("participants") or []]
+    for field in ("paid", "responsible_for", "share"):
+        present = [p for p in participants if p.get(field) is not None]
+        if not present:
+            continue
+        spread = spread_minor([p[field] for p in present], currency, amount) if len(present) == len(participants) else None
+        for i, participant in enumerate(present):
+            participant[field] = spread[i] if spread is not None else to_minor(participant[field], currency, strict=False)
+    return {
+        "amount": amount,
+        "participants": participants,
+        "money_units": MONEY_UNITS
+    }
+
+
+async def convert_expenses(dry_run: bool = False) -> int:
+    converted = 0
+    async for expense in expenses_collection.find(NOT_CONVERTED):
+        fields = convert_expense(expense)
+        if not dry_run:
+            await expenses_collection.update_one({"_id": expense["_id"], **NOT_CONVERTED}, {"$set": fields})
+        converted += 1
+
+    action = "would convert" if dry_run else "converted"
+    print(f"[MIGRATE] Done: {action} {converted} expenses")
+    return converted
+
+
+async def event_totals(event_oid) -> dict:
+    """currency_balances and total_expenses_by_currency recomputed from the event's expenses"""
+    totals = {}
+    async for row in expenses_collection.aggregate([
+        {"$match": {"event_id": event_oid}},
+        {"$group": {"_id": "$currency", "total": {"$sum": "$amount"}}}
+    ]):
+        totals[row["_id"]] = row["total"]
+
+    balances = {}
+    async for row in expenses_collection.aggregate([
+        {"$match": {"event_id": event_oid}},
+        {"$unwind": "$participants"},
+        # Old-style expenses (share only) never touched the balances
+        {"$match": {"participants.paid": {"$exists": True}, "participants.responsible_for": {"$exists": True}}},
+        {"$group": {
+            "_id": {"currency": "$currency", "user_id": "$participants.user_id"},
+            "balance": {"$sum": {"$subtract": ["$participants.paid", "$participants.responsible_for"]}}
+        }}
+    ]):
+        balances.setdefault(row["_id"]["currency"], {})[row["_id"]["user_id"]] = row["balance"]
+
+    return {"currency_balances": balances, "total_expenses_by_currency": totals}
+
+
+async def convert_events() -> int:
+    """Run after convert_expenses - the totals are summed from converted amounts"""
+    converted = 0
+    cursor = events_collection.find(NOT_CONVERTED, {"base_currency": 1, "final_balances": 1, "final_payments": 1})
+
+    async for event in cursor:
+        fields = await event_totals(event["_id"])
+        fields["money_units"] = MONEY_UNITS
+
+        final_currency = event.get("base_currency")
+        if final_currency and event.get("final_balances"):
+            fields["final_balances"] = {
+                user_id: to_minor(balance, final_currency, strict=False)
+                for user_id, balance in event["final_balances"].items()
+            }
+        if event.get("final_payments"):
+            fields["final_payments"] = [
+                {**payment, "amount": to_minor(payment["amount"], payment["currency"], strict=False)}
+                for payment in event["final_payments"]
+            ]
+
+        await events_collection.update_one(
+            {"_id": event["_id"], **NOT_CONVERTED},
+            {"$set": fields, "$inc": {"version": 1}}
+        )
+        converted += 1
+
+    print(f"[MIGRATE] Done: converted {converted} events")
+    return converted
+
+
+async def migrate(dry_run: bool = False):
+    await ping_database()
+    # Expenses first - event totals are summed from the converted amounts
+    await convert_expenses(dry_run=dry_run)
+    if dry_run:
+        print("[MIGRATE] Event totals are rebuilt from converted expenses - run without --dry-run to see them")
+        return
+    await convert_events()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert stored amounts to integer minor units")
+    parser.add_argument("--dry-run", action="store_true", help="only report, do not write")
+    args = parser.parse_args()
+    asyncio.run(migrate(dry_run=args.dry_run))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,83 @@
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, Optional, Tuple
 from jose import jwt, JWTError
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from app.services.lru import LRUCache
+from app.services.tracing import span
+import hashlib
 import os
+import time
 
 security = HTTPBearer()
 
 SECRET_KEY = os.getenv("SECRET_KEY", "supersecretkey")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 120
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+
+
+class VerifiedTokenCache:
+    """
+    Bounded LRU of already verified token claims, keyed by the token's SHA-256 digest.
+    An entry lives until the token's exp, so an expired token is always
+    decoded again (and rejected). Revocations are kept until the token would
+    have expired anyway. Both live in this process only.
+    """
+
+    def __init__(self, max_size: int = TOKEN_CACHE_SIZE):
+        self._entries: LRUCache[str, Tuple[Dict[str, str], float]] = LRUCache(
+            max_size, extra_counters=("expired", "revoked_rejections")
+        )
+        self._revoked: Dict[str, float] = {}
+
+    def get(self, digest: str) -> Optional[Dict[str, str]]:
+        entry = self._entries.peek(digest)
+        if entry is None:
+            self._entries.record_miss()
+            return None
+        claims, expires_at = entry
+        if time.time() >= expires_at:
+            self._entries.pop(digest)
+            self._entries.count("expired")
+            self._entries.record_miss()
+            return None
+        self._entries.record_hit(digest)
+        return claims
+
+    def put(self, digest: str, claims: Dict[str, str], expires_at: float):
+        self._entries.put(digest, (claims, expires_at))
+
+    def is_revoked(self, digest: str) -> bool:
+        expires_at = self._revoked.get(digest)
+        if expires_at is None:
+            return False
+        if time.time() >= expires_at:
+            # The token is expired now - jwt.decode rejects it without our help
+            del self._revoked[digest]
+            return False
+        self._entries.count("revoked_rejections")
+        return True
+
+    def revoke(self, digest: str, expires_at: float):
+        self._entries.pop(digest)
+        self._revoked[digest] = expires_at
+        # Forget revocations of tokens that have expired in the meantime
+        now = time.time()
+        for expired in [d for d, exp in self._revoked.items() if exp <= now]:
+            del self._revoked[expired]
+
+    def stats(self) -> Dict[str, float]:
+        stats = self._entries.stats()
+        stats["revoked"] = len(self._revoked)
+        return stats
+
+
+token_cache = VerifiedTokenCache()
+
+
+def _token_digest(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create JWT access token"""
@@ -18,11 +86,36 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    """Get current user from JWT token"""
+def revoke_token(token: str):
+    """Reject this token from now on, even though its signature and exp are still valid"""
+    try:
+        claims = jwt.get_unverified_claims(token)
+    except JWTError:
+        return  # Not a JWT - it can never pass verification anyway
+    expires_at = claims.get("exp")
+    if not isinstance(expires_at, (int, float)):
+        expires_at = time.time() + ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    token_cache.revoke(_token_digest(token), float(expires_at))
+
+
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """Get current user from JWT token (verified tokens are cached until they expire)"""
     token = credentials.credentials
+    digest = _token_digest(token)
+
+    if token_cache.is_revoked(digest):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, 
+            detail="Token revoked"
+        )
+
+    cached = token_cache.get(digest)
+    if cached is not None:
+        return dict(cached)
+
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        with span("jwt.decode"):
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id: str = payload.get("user_id")
         email: str = payload.get("email")
         if not user_id or not email:
@@ -30,7 +123,12 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
                 status_code=status.HTTP_401_UNAUTHORIZED, 
                 detail="Invalid token"
             )
-        return {"user_id": user_id, "email": email}
+        current_user = {"user_id": user_id, "email": email}
+        expires_at = payload.get("exp")
+        # Without an exp the entry would never expire - verify such tokens every time
+        if isinstance(expires_at, (int, float)):
+            token_cache.put(digest, current_user, float(expires_at))
+        return dict(current_user)
     except jwt.ExpiredSignatureError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, 
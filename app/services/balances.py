@@ -0,0 +1,159 @@
+# app/services/balances.py
+# Balance engine: an event's per-currency balances as a dense members x currencies matrix
+# of integer minor units (see app/models/money.py)
+
+from functools import cached_property
+from itertools import repeat
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from app.models.money import MinorUnits, currency_exponent
+
+
+class BalanceMatrix:
+    """
+    Dense int64 matrix of an event's balances:
+    - rows: members (member_index maps user_id -> row)
+    - columns: currencies (currency_index maps code -> column)
+    - values[row, col]: what the member paid minus what they are responsible for,
+      in minor units of that currency
+
+    Every balance sum and currency conversion in the routes goes through here.
+    """
+
+    def __init__(self, member_ids: List[str], currencies: List[str], values: np.ndarray):
+        self.member_ids = member_ids
+        self.currencies = currencies
+        self.values = values
+
+    @cached_property
+    def member_index(self) -> Dict[str, int]:
+        # Built on first use - rendering a whole event never needs it
+        return {user_id: row for row, user_id in enumerate(self.member_ids)}
+
+    @cached_property
+    def currency_index(self) -> Dict[str, int]:
+        return {currency: col for col, currency in enumerate(self.currencies)}
+
+    @classmethod
+    def from_event(cls, event: dict, user_ids: Optional[Iterable[str]] = None) -> "BalanceMatrix":
+        """
+        Build from event["members"] and event["currency_balances"] ({"EUR": {"user1": 1000}}).
+        user_ids: only these members' rows (e.g. the ones an expense write touched) -
+        the cost then follows their number, not the event size.
+        Rows start with the members in event["members"] order.
+        """
+        currency_balances = event.get("currency_balances") or {}
+        if user_ids is not None:
+            wanted = set(user_ids)
+            member_ids = [m["user_id"] for m in event.get("members", []) if m["user_id"] in wanted]
+        else:
+            member_ids = [m["user_id"] for m in event.get("members", [])]
+            # Balances can outlive a membership - keep those users as extra rows
+            known = set(member_ids)
+            for balances in currency_balances.values():
+                if balances.keys() <= known:  # the usual case - no per-key Python loop
+                    continue
+                for user_id in balances:
+                    if user_id not in known:
+                        known.add(user_id)
+                        member_ids.append(user_id)
+
+        currencies = list(currency_balances)
+        count = len(member_ids)
+        values = np.zeros((count, len(currencies)), dtype=np.int64)
+        for col, currency in enumerate(currencies):
+            # One C-level pass per currency column: dict.get mapped over the row order
+            values[:, col] = np.fromiter(
+                map(currency_balances[currency].get, member_ids, repeat(0, count)), dtype=np.int64, count=count
+            )
+        return cls(member_ids, currencies, values)
+
+    def totals(self) -> np.ndarray:
+        """
+        Per-member sum over all currencies, without conversion (the "balance" shown on events).
+        Exact: every column is brought to the finest exponent as integers, then divided once.
+        """
+        return _sum_columns_major(self.values, self.currencies)
+
+    def rate_vector(self, rates: Dict[str, float], target_currency: str) -> np.ndarray:
+        """
+        Column of multipliers into target_currency, one per currency of the matrix.
+        rates: currency -> multiplier into the target (the target itself is 1.0).
+        Raises KeyError with the first currency that has no rate.
+        """
+        vector = np.ones(len(self.currencies))
+        for col, currency in enumerate(self.currencies):
+            if currency != target_currency:
+                vector[col] = rates[currency]
+        return vector
+
+    def convert(self, rate_vector: np.ndarray, target_currency: str) -> np.ndarray:
+        """
+        Per-member balance converted into minor units of target_currency:
+        one matrix-vector product, then rounding that keeps the total (zero for a
+        balanced event) exact.
+        """
+        target_scale = 10.0 ** currency_exponent(target_currency)
+        per_unit = rate_vector * _minor_scale(self.currencies) * target_scale
+        return round_preserving_total(self.values @ per_unit)
+
+    def as_dict(self, vector: np.ndarray, user_ids: Optional[Iterable[str]] = None) -> Dict[str, float]:
+        """user_id -> value for a per-member vector (all members, or only user_ids)"""
+        values = vector.tolist()  # one conversion to Python numbers instead of a numpy scalar per member
+        if user_ids is None:
+            return dict(zip(self.member_ids, values))
+        return {user_id: values[self.member_index[user_id]] for user_id in user_ids if user_id in self.member_index}
+
+
+def _minor_scale(currencies: List[str]) -> np.ndarray:
+    """Multiplier from minor to major units, per currency"""
+    return np.array([10.0 ** -currency_exponent(currency) for currency in currencies])
+
+
+def _sum_columns_major(values: np.ndarray, currencies: List[str]) -> np.ndarray:
+    """Row sums of minor-unit columns in different currencies, as major amounts"""
+    if not currencies:
+        return np.zeros(values.shape[:-1])
+    exponents = [currency_exponent(currency) for currency in currencies]
+    finest = max(exponents)
+    common = np.array([10 ** (finest - exponent) for exponent in exponents], dtype=np.int64)
+    return (values @ common) / 10 ** finest
+
+
+def round_preserving_total(values: np.ndarray) -> np.ndarray:
+    """
+    Round fractional minor units to int64 so that the result sums to the rounded total
+    (largest remainder), instead of every member's rounding error adding up.
+    """
+    floors = np.floor(values)
+    shortfall = int(round(float(values.sum()))) - int(floors.sum())
+    result = floors.astype(np.int64)
+    if shortfall:
+        order = np.argsort(floors - values)  # largest remainder first
+        result[order[:shortfall]] += 1
+    return result
+
+
+def total_major(totals_by_currency: Dict[str, MinorUnits]) -> float:
+    """Sum of per-currency totals without conversion (the event "total_expenses")"""
+    if not totals_by_currency:
+        return 0.0
+    values = np.fromiter(totals_by_currency.values(), dtype=np.int64, count=len(totals_by_currency))
+    return float(_sum_columns_major(values, list(totals_by_currency)))
+
+
+def convert_totals(totals_by_currency: Dict[str, MinorUnits], rates: Dict[str, float], target_currency: str) -> MinorUnits:
+    """Per-currency totals converted into minor units of target_currency (missing rates count as 1.0)"""
+    if not totals_by_currency:
+        return 0
+    currencies = list(totals_by_currency)
+    amounts = np.fromiter(totals_by_currency.values(), dtype=np.int64, count=len(currencies))
+    multipliers = np.fromiter(
+        (1.0 if currency == target_currency else rates.get(currency, 1.0) for currency in currencies),
+        dtype=float,
+        count=len(currencies)
+    )
+    per_unit = multipliers * _minor_scale(currencies) * 10.0 ** currency_exponent(target_currency)
+    return int(round(float(amounts @ per_unit)))
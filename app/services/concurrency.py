@@ -0,0 +1,88 @@
+# app/services/concurrency.py
+# Optimistic concurrency on event documents: writes carry the version they were
+# computed from, a conflict re-reads and retries a bounded number of times
+
+import asyncio
+import os
+import random
+from collections import defaultdict
+from typing import Awaitable, Callable, Dict, TypeVar
+
+from fastapi import HTTPException
+
+OCC_MAX_ATTEMPTS = int(os.getenv("OCC_MAX_ATTEMPTS", "5"))
+if OCC_MAX_ATTEMPTS < 1:
+    raise ValueError(f"OCC_MAX_ATTEMPTS must be at least 1, got {OCC_MAX_ATTEMPTS}")
+OCC_BACKOFF_SECONDS = float(os.getenv("OCC_BACKOFF_SECONDS", "0.01"))
+
+T = TypeVar("T")
+
+
+class VersionConflict(Exception):
+    """The event changed since it was read - raised by an attempt whose conditional write matched nothing"""
+
+    def __init__(self, current_version: int):
+        super().__init__(f"Event is now at version {current_version}")
+        self.current_version = current_version
+
+
+class ConflictStats:
+    """Per-operation counters: attempts, conflicts (each retry), exhausted (ended in 409)"""
+
+    def __init__(self):
+        self._counters: Dict[str, Dict[str, int]] = defaultdict(lambda: {"attempts": 0, "conflicts": 0, "exhausted": 0})
+
+    def record(self, operation: str, counter: str):
+        self._counters[operation][counter] += 1
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        result = {}
+        for operation, counters in self._counters.items():
+            result[operation] = dict(counters)
+            result[operation]["conflict_rate"] = counters["conflicts"] / counters["attempts"] if counters["attempts"] else 0.0
+        return result
+
+
+conflict_stats = ConflictStats()
+
+
+def version_filter(event: dict) -> dict:
+    """
+    Update filter that only matches the event at the version it was read at.
+    Events from before versioning have no field - match those by its absence.
+    """
+    if "version" in event:
+        return {"_id": event["_id"], "version": event["version"]}
+    return {"_id": event["_id"], "version": {"$exists": False}}
+
+
+async def with_version_retry(
+    operation: str,
+    attempt: Callable[[], Awaitable[T]],
+    max_attempts: int = OCC_MAX_ATTEMPTS
+) -> T:
+    """
+    Run attempt() (read the event, compute, write with version_filter) until it
+    does not raise VersionConflict. Backs off with jitter between attempts so
+    competing writers spread out; after max_attempts answers 409 with the current version.
+    """
+    if max_attempts < 1:
+        raise ValueError(f"max_attempts must be at least 1, got {max_attempts}")
+    for attempt_number in range(max_attempts):
+        conflict_stats.record(operation, "attempts")
+        try:
+            return await attempt()
+        except VersionConflict as conflict:
+            conflict_stats.record(operation, "conflicts")
+            current_version = conflict.current_version
+        if attempt_number + 1 < max_attempts:
+            await asyncio.sleep(random.uniform(0, OCC_BACKOFF_SECONDS * 2 ** attempt_number))
+
+    conflict_stats.record(operation, "exhausted")
+    raise HTTPException(
+        status_code=409,
+        detail={
+            "message": "Event is being changed by other requests, please retry",
+            "current_version": current_version
+        }
+    )
@@ -0,0 +1,45 @@
+# app/services/cross_rates.py
+# Every currency pair at once: an N x N cross-rate matrix built from one USD-based rate vector
+
+from typing import Dict, Iterable, List
+
+import numpy as np
+
+
+class CrossRateMatrix:
+    """
+    rates[i, j] = units of currencies[j] per 1 unit of currencies[i].
+    Built in one vectorized step from USD rates (units per 1 USD):
+    converting i -> j is i -> USD -> j, i.e. usd[j] / usd[i], so the matrix is
+    the outer product of 1 / usd and usd. Pair lookups are two dict hits and an index.
+    """
+
+    def __init__(self, usd_rates: Dict[str, float]):
+        self.source = usd_rates  # the rates dict this was built from
+        rates = {"USD": 1.0, **{c: r for c, r in usd_rates.items() if r and r > 0}}
+        self.currencies: List[str] = sorted(rates)
+        self.index = {currency: i for i, currency in enumerate(self.currencies)}
+        usd = np.array([rates[currency] for currency in self.currencies], dtype=float)
+        self.rates = np.outer(1.0 / usd, usd)
+        np.fill_diagonal(self.rates, 1.0)  # exact, not usd / usd
+
+    def __contains__(self, currency: str) -> bool:
+        return currency in self.index
+
+    def rate(self, from_currency: str, to_currency: str) -> float:
+        """Units of to_currency per 1 from_currency. Raises KeyError for an unknown currency."""
+        return float(self.rates[self.index[from_currency], self.index[to_currency]])
+
+    def rates_into(self, target_currency: str, currencies: Iterable[str]) -> Dict[str, float]:
+        """currency -> multiplier into target_currency, for every known currency in currencies"""
+        column = self.rates[:, self.index[target_currency]]
+        return {currency: float(column[self.index[currency]]) for currency in currencies if currency in self.index}
+
+    def convert_many(self, amounts: np.ndarray, from_currencies: List[str], to_currencies: List[str]) -> np.ndarray:
+        """
+        Element-wise amounts[k] from from_currencies[k] into to_currencies[k], as one gather.
+        Raises KeyError with the first unknown currency.
+        """
+        rows = np.fromiter((self.index[c] for c in from_currencies), dtype=np.intp, count=len(from_currencies))
+        cols = np.fromiter((self.index[c] for c in to_currencies), dtype=np.intp, count=len(to_currencies))
+        return amounts * self.rates[rows, cols]
@@ -1,24 +1,37 @@
 import os
-from pymongo import MongoClient
+from motor.motor_asyncio import AsyncIOMotorClient
 from pymongo.errors import ServerSelectionTimeoutError
 from dotenv import load_dotenv
+from app.services.log import get_logger
+from app.services.metrics import mongo_command_metrics
+from app.services.tracing import mongo_tracing
 
 # טוען משתני סביבה מהקובץ .env
 load_dotenv()
 
+logger = get_logger(__name__)
+
 def default_mongo_url():
     if os.path.exists("/.dockerenv") or os.getenv("RUNNING_IN_DOCKER") == "1":
         return "mongodb://mongo:27017"
     return "mongodb://127.0.0.1:27017"
 
 MONGO_URL = os.getenv("MONGO_URL", default_mongo_url())
-print(f"[DB] Connecting to: {MONGO_URL}")
+logger.info("Connecting to MongoDB", extra={"mongo_url": MONGO_URL})
+
+# Motor connects lazily, so building the client here never blocks the import.
+# The listeners time every command for /metrics and for the request's trace.
+client = AsyncIOMotorClient(
+    MONGO_URL, serverSelectionTimeoutMS=5000, event_listeners=[mongo_command_metrics, mongo_tracing]
+)
+db = client["splitbills"]
+
 
-client = MongoClient(MONGO_URL, serverSelectionTimeoutMS=5000)
-try:
-    client.admin.command("ping")
-    db = client["splitbills"]
-    print("[DB] ✅ Connected to MongoDB")
-except ServerSelectionTimeoutError as e:
-    print(f"[DB] ❌ Could not connect: {e}")
-    raise
+async def ping_database():
+    """Check the connection once at startup instead of on import"""
+    try:
+        await client.admin.command("ping")
+        logger.info("Connected to MongoDB")
+    except ServerSelectionTimeoutError as e:
+        logger.error("Could not connect to MongoDB: %s", e)
+        raise
@@ -0,0 +1,113 @@
+# app/services/indexes.py
+# Every index the app relies on, created at startup, plus a check that the
+# app's queries actually use them (no COLLSCAN in their winning plans)
+
+from datetime import datetime
+from typing import Dict, List
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+from app.services.db import db
+from app.services.log import get_logger
+
+logger = get_logger(__name__)
+
+INDEXES: Dict[str, List[IndexModel]] = {
+    "users": [
+        # login, register and create_event look users up by email
+        IndexModel([("email", ASCENDING)], unique=True, name="email_unique"),
+    ],
+    "events": [
+        # /my-events: "$or" over members.user_id and created_by, newest first (_id breaks ties)
+        IndexModel(
+            [("members.user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+            name="members_user_id_created_at_id"
+        ),
+        IndexModel(
+            [("created_by", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+            name="created_by_created_at_id"
+        ),
+    ],
+    "expenses": [
+        # Expenses of one event, newest first, for paging
+        IndexModel([("event_id", ASCENDING), ("created_at", ASCENDING), ("_id", ASCENDING)], name="event_id_created_at"),
+    ],
+    "exchange_rates": [
+        # One snapshot per date; the in-memory rate index re-reads what was recorded since its last load
+        IndexModel([("base", ASCENDING), ("as_of", ASCENDING)], unique=True, name="base_as_of_unique"),
+        IndexModel([("base", ASCENDING), ("recorded_at", ASCENDING)], name="base_recorded_at"),
+    ],
+}
+
+_probe_oid = ObjectId()
+_probe_user = str(_probe_oid)
+
+# Representative shapes of the app's hot queries: (name, collection, filter, sort)
+QUERY_SHAPES = [
+    ("users by email (login/register)", "users", {"email": "probe@example.com"}, None),
+    ("creator + invited members (create_event)", "users",
+     {"$or": [{"_id": _probe_oid}, {"email": {"$in": ["probe@example.com"]}}]}, None),
+    ("my events (get_my_events)", "events",
+     {"$or": [
+         {"created_by": _probe_user},
+         {"members.user_id": _probe_user},
+         {"created_by": _probe_oid},
+         {"members.user_id": _probe_oid},
+     ]},
+     {"created_at": -1, "_id": -1}),
+    ("event expenses page (get_event)", "expenses",
+     {"event_id": _probe_oid, "$or": [
+         {"created_at": {"$lt": datetime.utcnow()}},
+         {"created_at": datetime.utcnow(), "_id": {"$lt": _probe_oid}},
+     ]},
+     {"created_at": -1, "_id": -1}),
+]
+
+
+async def ensure_indexes() -> List[str]:
+    """Create every declared index (no-op for ones that already exist). Returns the index names."""
+    created = []
+    for collection, models in INDEXES.items():
+        try:
+            created.extend(await db[collection].create_indexes(models))
+        except OperationFailure as e:
+            # e.g. duplicate emails already stored - keep serving, but say so loudly
+            logger.error("Could not create indexes on %s: %s", collection, e)
+    return created
+
+
+def _plan_stages(plan: dict) -> List[str]:
+    """All stage names in an explain plan tree"""
+    stages = [plan.get("stage", "")]
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            stages.extend(_plan_stages(plan[key]))
+    for child in plan.get("inputStages", []):
+        stages.extend(_plan_stages(child))
+    return stages
+
+
+async def find_collscans() -> List[str]:
+    """Explain every query shape and return the names of those that still plan as COLLSCAN"""
+    collscans = []
+    for name, collection, query, sort in QUERY_SHAPES:
+        command = {"find": collection, "filter": query}
+        if sort:
+            command["sort"] = sort
+        try:
+            explained = await db.command("explain", command, verbosity="queryPlanner")
+        except Exception as e:
+            logger.warning("Could not explain query %s: %s", name, e)
+            continue
+        if "COLLSCAN" in _plan_stages(explained["queryPlanner"]["winningPlan"]):
+            collscans.append(name)
+    return collscans
+
+
+async def bootstrap_indexes():
+    """Startup step: create the indexes, then report any query that still scans a collection"""
+    await ensure_indexes()
+    for name in await find_collscans():
+        logger.warning("Query still plans as COLLSCAN: %s", name, extra={"query_shape": name})
@@ -0,0 +1,79 @@
+# app/services/lru.py
+# The bounded LRU under the in-process caches, with the counters their stats() report
+
+from collections import OrderedDict
+from typing import Callable, Dict, Generic, Hashable, Optional, Tuple, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class LRUCache(Generic[K, V]):
+    """
+    OrderedDict capped at max_size: reads move an entry to the end, puts past
+    the cap evict from the front.
+    Counts hits, misses and evictions; owners declare their own counters in
+    extra_counters and bump them with count(). on_evict(key, value) runs for
+    every entry the cap pushes out (not for pop()).
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        extra_counters: Tuple[str, ...] = (),
+        on_evict: Optional[Callable[[K, V], None]] = None
+    ):
+        self.max_size = max_size
+        self._entries: "OrderedDict[K, V]" = OrderedDict()
+        self._on_evict = on_evict
+        self._counters: Dict[str, int] = dict.fromkeys(("hits", "misses", "evictions", *extra_counters), 0)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: K, valid: Optional[Callable[[V], bool]] = None) -> Optional[V]:
+        """The entry (counted as a hit), or None (a miss) if absent or valid(entry) is false"""
+        value = self._entries.get(key)
+        if value is None or (valid is not None and not valid(value)):
+            self.record_miss()
+            return None
+        self.record_hit(key)
+        return value
+
+    def peek(self, key: K) -> Optional[V]:
+        """The entry without counting a lookup or refreshing it"""
+        return self._entries.get(key)
+
+    def record_hit(self, key: K):
+        """Count a hit for an entry read with peek() and mark it recently used"""
+        self._entries.move_to_end(key)
+        self._counters["hits"] += 1
+
+    def record_miss(self):
+        self._counters["misses"] += 1
+
+    def put(self, key: K, value: V):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            old_key, old_value = self._entries.popitem(last=False)
+            self._counters["evictions"] += 1
+            if self._on_evict is not None:
+                self._on_evict(old_key, old_value)
+
+    def pop(self, key: K) -> Optional[V]:
+        return self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def count(self, counter: str, amount: int = 1):
+        self._counters[counter] += amount
+
+    def stats(self) -> Dict[str, float]:
+        stats: Dict[str, float] = dict(self._counters)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["size"] = len(self._entries)
+        stats["max_size"] = self.max_size
+        return stats
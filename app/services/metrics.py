@@ -0,0 +1,242 @@
+# app/services/metrics.py
+# Prometheus metrics: request latency per route, MongoDB command timing per
+# collection and command, event document sizes, and the app's cache counters.
+# Everything lives in the default prometheus_client registry and is served at /metrics.
+#
+# MONGO_DOCUMENT_SIZE_SAMPLE_RATE - fraction of sized-collection commands whose
+# documents are BSON-encoded again to record their size (default 0: off). The
+# driver reports no sizes, so each sample costs a re-encode on the request path.
+
+import os
+import random
+import time
+from threading import Lock
+from typing import Callable, Dict, Optional, Tuple
+
+import bson
+from prometheus_client import Counter, Gauge, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, REGISTRY
+from pymongo import monitoring
+from starlette.routing import Match
+
+# Buckets in seconds - Mongo round trips are mostly sub-millisecond to tens of ms
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+MONGO_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0, 5.0)
+# BSON bytes, 1 KB .. 16 MB (Mongo's document limit)
+DOCUMENT_SIZE_BUCKETS = tuple(2 ** p for p in range(10, 25))
+
+SIZED_COLLECTIONS = {"events"}
+DOCUMENT_SIZE_SAMPLE_RATE = float(os.getenv("MONGO_DOCUMENT_SIZE_SAMPLE_RATE", "0"))
+
+http_request_duration = Histogram(
+    "http_request_duration_seconds", "Request latency by route template",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS
+)
+http_requests_in_flight = Gauge(
+    "http_requests_in_flight", "Requests being handled right now", ["method", "route"]
+)
+mongo_command_duration = Histogram(
+    "mongo_command_duration_seconds", "MongoDB command round trip by collection and command",
+    ["collection", "command", "outcome"], buckets=MONGO_BUCKETS
+)
+mongo_document_size = Histogram(
+    "mongo_document_size_bytes", "BSON size of sampled documents read from or written to sized collections",
+    ["collection", "direction"], buckets=DOCUMENT_SIZE_BUCKETS
+)
+mongo_full_document_writes = Counter(
+    "mongo_full_document_writes_total", "Updates that replace a whole document instead of using $ operators",
+    ["collection"]
+)
+
+
+# -----------------------------
+# HTTP
+# -----------------------------
+
+def route_template(app, scope) -> str:
+    """The path template that will handle scope ("/events/{event_id}"), so labels stay bounded"""
+    template = scope.get("route_template")
+    if template is None:
+        template = "unmatched"
+        for route in app.router.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                template = getattr(route, "path", scope["path"])
+                break
+        scope["route_template"] = template  # the tracing middleware needs it too
+    return template
+
+
+class MetricsMiddleware:
+    """Latency histogram and in-flight gauge per route (plain ASGI, so streaming bodies are timed to the end)"""
+
+    def __init__(self, app, fastapi_app=None):
+        self.app = app
+        self.fastapi_app = fastapi_app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.fastapi_app is None:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = route_template(self.fastapi_app, scope)
+        status = {"code": 500}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        in_flight = http_requests_in_flight.labels(method, route)
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            in_flight.dec()
+            http_request_duration.labels(method, route, str(status["code"])).observe(time.perf_counter() - start)
+
+
+# -----------------------------
+# MongoDB
+# -----------------------------
+
+def _command_collection(command_name: str, command) -> str:
+    if command_name == "getMore":
+        return command.get("collection", "")
+    value = command.get(command_name)
+    return value if isinstance(value, str) else ""
+
+
+def _is_replacement(update) -> bool:
+    return isinstance(update, dict) and bool(update) and not any(key.startswith("$") for key in update)
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """
+    Times every command the driver sends. The collection is only in the started
+    event, so it is remembered per (connection, request ID) until the reply comes.
+    For sized collections it also counts whole-document rewrites and, for a
+    sample_rate share of commands, records document sizes.
+    """
+
+    def __init__(self, sample_rate: float = DOCUMENT_SIZE_SAMPLE_RATE):
+        self.sample_rate = sample_rate
+        self._pending: Dict[Tuple[object, int], Tuple[str, str]] = {}
+        self._lock = Lock()
+
+    def started(self, event):
+        collection = _command_collection(event.command_name, event.command)
+        with self._lock:
+            self._pending[(event.connection_id, event.request_id)] = (collection, event.command_name)
+        if collection in SIZED_COLLECTIONS:
+            self._observe_writes(collection, event.command_name, event.command, self._sampled())
+
+    def succeeded(self, event):
+        collection = self._finish(event, "ok")
+        if collection in SIZED_COLLECTIONS and self._sampled():
+            self._observe_reads(collection, event.command_name, event.reply)
+
+    def _sampled(self) -> bool:
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def failed(self, event):
+        self._finish(event, "error")
+
+    def _finish(self, event, outcome: str) -> str:
+        with self._lock:
+            collection, command_name = self._pending.pop(
+                (event.connection_id, event.request_id), ("", event.command_name)
+            )
+        mongo_command_duration.labels(collection or "-", command_name, outcome).observe(event.duration_micros / 1e6)
+        return collection
+
+    @staticmethod
+    def _observe_writes(collection: str, command_name: str, command, sized: bool):
+        if command_name == "insert":
+            if not sized:
+                return
+            for document in command.get("documents", ()):
+                mongo_document_size.labels(collection, "write").observe(len(bson.encode(document)))
+            return
+        if command_name == "update":
+            updates = [u.get("u") for u in command.get("updates", ())]
+        elif command_name == "findAndModify":
+            updates = [command.get("update")]
+        else:
+            return
+        for update in updates:
+            if _is_replacement(update):
+                mongo_full_document_writes.labels(collection).inc()
+                if sized:
+                    mongo_document_size.labels(collection, "write").observe(len(bson.encode(update)))
+
+    @staticmethod
+    def _observe_reads(collection: str, command_name: str, reply):
+        if command_name in ("find", "getMore"):
+            cursor = reply.get("cursor", {})
+            documents = cursor.get("firstBatch") or cursor.get("nextBatch") or ()
+        elif command_name == "findAndModify":
+            documents = [reply["value"]] if reply.get("value") else ()
+        else:
+            return
+        for document in documents:
+            mongo_document_size.labels(collection, "read").observe(len(bson.encode(document)))
+
+
+mongo_command_metrics = MongoCommandMetrics()
+
+
+# -----------------------------
+# Cache counters
+# -----------------------------
+
+class CacheStatsCollector:
+    """
+    Reads the caches' own stats() at scrape time, so the hot paths pay nothing extra.
+    Keys listed as gauges become splitbills_cache_<key>{cache}; every other
+    integer becomes splitbills_cache_events_total{cache, event}.
+    """
+
+    DEFAULT_GAUGES = ("hit_rate", "size", "max_size")
+
+    def __init__(self):
+        self._sources: Dict[str, Tuple[Callable[[], Dict[str, object]], Tuple[str, ...]]] = {}
+        self._conflicts: Optional[Callable[[], Dict[str, Dict[str, float]]]] = None
+
+    def add_cache(self, name: str, stats: Callable[[], Dict[str, object]], gauges: Tuple[str, ...] = DEFAULT_GAUGES):
+        self._sources[name] = (stats, gauges)
+
+    def set_conflict_stats(self, stats: Callable[[], Dict[str, Dict[str, float]]]):
+        self._conflicts = stats
+
+    def collect(self):
+        events = CounterMetricFamily("splitbills_cache_events", "Cache lookups and maintenance by outcome", labels=["cache", "event"])
+        gauges: Dict[str, GaugeMetricFamily] = {}
+        for cache, (stats_fn, gauge_keys) in self._sources.items():
+            for key, value in stats_fn().items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                if key in gauge_keys:
+                    if key not in gauges:
+                        gauges[key] = GaugeMetricFamily(f"splitbills_cache_{key}", f"Cache {key.replace('_', ' ')}", labels=["cache"])
+                    gauges[key].add_metric([cache], value)
+                elif isinstance(value, int):
+                    events.add_metric([cache, key], value)
+        yield events
+        yield from gauges.values()
+
+        if self._conflicts is not None:
+            occ = CounterMetricFamily("splitbills_occ", "Optimistic-concurrency attempts, conflicts and exhausted retries", labels=["operation", "outcome"])
+            conflict_rate = GaugeMetricFamily("splitbills_occ_conflict_rate", "Conflicts per attempt", labels=["operation"])
+            for operation, counters in self._conflicts().items():
+                for outcome in ("attempts", "conflicts", "exhausted"):
+                    occ.add_metric([operation, outcome], counters.get(outcome, 0))
+                conflict_rate.add_metric([operation], counters.get("conflict_rate", 0.0))
+            yield occ
+            yield conflict_rate
+
+
+cache_stats_collector = CacheStatsCollector()
+REGISTRY.register(cache_stats_collector)
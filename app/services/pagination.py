@@ -0,0 +1,42 @@
+# app/services/pagination.py
+# Opaque keyset cursors for newest-first listings ordered by (created_at, _id)
+
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+
+from bson import ObjectId
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# Newest first; _id breaks ties between documents created in the same millisecond
+NEWEST_FIRST = [("created_at", -1), ("_id", -1)]
+
+
+def encode_cursor(created_at: datetime, oid: ObjectId) -> str:
+    """Cursor pointing just after the given document"""
+    raw = json.dumps({"t": created_at.isoformat(), "id": str(oid)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, ObjectId]:
+    """Reverse of encode_cursor - raises ValueError for anything it did not produce"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(data["t"]), ObjectId(data["id"])
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def after_cursor_filter(cursor: Optional[str]) -> dict:
+    """Query condition selecting the documents that come after the cursor (newest first)"""
+    if not cursor:
+        return {}
+    created_at, oid = decode_cursor(cursor)
+    return {"$or": [
+        {"created_at": {"$lt": created_at}},
+        {"created_at": created_at, "_id": {"$lt": oid}}
+    ]}
@@ -0,0 +1,151 @@
+# app/services/rate_history.py
+# Dated exchange-rate snapshots: stored in the exchange_rates collection, mirrored
+# in memory so "rates as of <date>" is a bisect, never a network call
+
+import asyncio
+import bisect
+from datetime import datetime, timezone
+from typing import Dict, List, NamedTuple, Optional
+
+from pymongo import ReturnDocument
+
+from app.services.cross_rates import CrossRateMatrix
+from app.services.db import db
+from app.services.log import get_logger
+from app.services.lru import LRUCache
+from app.services.simple_exchange_rates import RATES_REFRESH_SECONDS, exchange_service
+
+logger = get_logger(__name__)
+
+rates_collection = db["exchange_rates"]
+
+# Snapshots are quoted like the live rates: units of currency per 1 USD
+RATES_BASE_CURRENCY = "USD"
+
+# Cross-rate matrices kept for recently used snapshots
+CROSS_RATES_CACHE_SIZE = 32
+
+
+class RateSnapshot(NamedTuple):
+    id: str
+    as_of: datetime
+    rates: Dict[str, float]
+
+
+class RateHistory:
+    """
+    In-memory index of every stored snapshot, sorted by as_of.
+    load() reads the collection once, sync() picks up snapshots written since
+    (by the importer or other API processes) and records newly fetched live rates.
+    """
+
+    def __init__(self):
+        self._as_of: List[datetime] = []
+        self._snapshots: List[RateSnapshot] = []
+        self._loaded_until: Optional[datetime] = None  # newest recorded_at read so far
+        self._sync_task: Optional[asyncio.Task] = None
+        self._cross_rates: LRUCache[str, CrossRateMatrix] = LRUCache(CROSS_RATES_CACHE_SIZE)
+
+    def _add(self, doc: dict):
+        snapshot = RateSnapshot(str(doc["_id"]), doc["as_of"], doc["rates"])
+        recorded_at = doc.get("recorded_at")
+        if recorded_at and (self._loaded_until is None or recorded_at > self._loaded_until):
+            self._loaded_until = recorded_at
+        position = bisect.bisect_right(self._as_of, snapshot.as_of)
+        if position and self._as_of[position - 1] == snapshot.as_of:
+            self._snapshots[position - 1] = snapshot  # re-imported date - newer copy wins
+            return
+        self._as_of.insert(position, snapshot.as_of)
+        self._snapshots.insert(position, snapshot)
+
+    async def load(self) -> int:
+        """
+        Read snapshots recorded since the last load (everything on the first call) into the index.
+        Goes by recorded_at, so imported history for old dates is picked up too
+        ($gte: another write may share the last millisecond - re-adding is harmless).
+        """
+        query = {"base": RATES_BASE_CURRENCY}
+        if self._loaded_until is not None:
+            query["recorded_at"] = {"$gte": self._loaded_until}
+        loaded = 0
+        async for doc in rates_collection.find(query, {"as_of": 1, "rates": 1, "recorded_at": 1}):
+            self._add(doc)
+            loaded += 1
+        return loaded
+
+    def rates_as_of(self, when: datetime) -> Optional[RateSnapshot]:
+        """The latest snapshot taken at or before when (None if history starts later)"""
+        if when.tzinfo is not None:
+            when = when.astimezone(timezone.utc).replace(tzinfo=None)  # stored times are naive UTC
+        position = bisect.bisect_right(self._as_of, when)
+        return self._snapshots[position - 1] if position else None
+
+    def latest(self) -> Optional[RateSnapshot]:
+        return self._snapshots[-1] if self._snapshots else None
+
+    def cross_rates(self, snapshot: RateSnapshot) -> CrossRateMatrix:
+        """The snapshot's cross-rate matrix, built on first use and kept for recently used snapshots"""
+        # A re-imported date replaces the snapshot's rates - its old matrix no longer applies
+        matrix = self._cross_rates.get(snapshot.id, lambda cached: cached.source is snapshot.rates)
+        if matrix is None:
+            matrix = CrossRateMatrix(snapshot.rates)
+            self._cross_rates.put(snapshot.id, matrix)
+        return matrix
+
+    async def record(self, as_of: datetime, rates: Dict[str, float], source: str) -> RateSnapshot:
+        """Store a snapshot (upsert on its date) and index it"""
+        doc = await rates_collection.find_one_and_update(
+            {"base": RATES_BASE_CURRENCY, "as_of": as_of},
+            {"$set": {"rates": rates, "source": source, "recorded_at": datetime.utcnow()}},
+            upsert=True,
+            # recorded_at left out on purpose: load() must still pick up snapshots
+            # other writers recorded just before this one
+            projection={"as_of": 1, "rates": 1},
+            return_document=ReturnDocument.AFTER
+        )
+        self._add(doc)
+        return self.rates_as_of(as_of)
+
+    async def capture_live(self):
+        """Store the live rates if they were fetched after the newest snapshot (no network call)"""
+        latest = self.latest()
+        fetched = exchange_service.fetched_snapshot()
+        if fetched and (latest is None or fetched[0] > latest.as_of):
+            await self.record(fetched[0], fetched[1], source="api")
+
+    async def sync(self):
+        """Persist newly fetched live rates, then read snapshots others stored"""
+        await self.capture_live()
+        await self.load()
+
+    def start_sync(self, interval_seconds: float = RATES_REFRESH_SECONDS):
+        if self._sync_task and not self._sync_task.done():
+            return
+
+        async def run():
+            while True:
+                await asyncio.sleep(interval_seconds)
+                try:
+                    await self.sync()
+                except Exception as e:
+                    logger.error("Could not sync exchange-rate history: %s", e)
+
+        self._sync_task = asyncio.get_running_loop().create_task(run())
+
+    def stop_sync(self):
+        if self._sync_task:
+            self._sync_task.cancel()
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "snapshots": len(self._snapshots),
+            "oldest": self._as_of[0].isoformat() if self._as_of else None,
+            "newest": self._as_of[-1].isoformat() if self._as_of else None,
+            "cross_rates_cache": self.cross_rates_stats()
+        }
+
+    def cross_rates_stats(self) -> Dict[str, float]:
+        return self._cross_rates.stats()
+
+
+rate_history = RateHistory()
@@ -0,0 +1,50 @@
+# app/services/settlement.py
+# Who pays whom: turns final member balances into a short list of transfers
+
+import heapq
+from typing import Dict, List, Tuple
+
+# (from_user_id, to_user_id, amount)
+Transfer = Tuple[str, str, float]
+
+
+def plan_payments(balances: Dict[str, float], tolerance: float = 0.01) -> List[Transfer]:
+    """
+    Greedy settlement with two max-heaps (largest debtor pays largest creditor).
+
+    - balances: user_id -> balance (positive = is owed money, negative = owes money)
+    - tolerance: balances within +-tolerance count as settled
+      (0 for integer minor units, which always sum to exactly zero)
+
+    Every transfer settles at least one side completely, so N members need at
+    most N-1 transfers, and the whole plan costs O(N log N).
+    Remaining debt and credit are pushed back to their heaps, so nobody is
+    ever paid more than they are owed.
+    """
+    # heapq is a min-heap - store negated amounts to pop the largest first
+    debtors = [(balance, user_id) for user_id, balance in balances.items() if balance < -tolerance]
+    creditors = [(-balance, user_id) for user_id, balance in balances.items() if balance > tolerance]
+    heapq.heapify(debtors)
+    heapq.heapify(creditors)
+
+    transfers: List[Transfer] = []
+    append = transfers.append
+    while debtors and creditors:
+        neg_debt, debtor_id = debtors[0]
+        neg_credit, creditor_id = creditors[0]
+
+        # Both amounts are negated - the larger one is the smaller payment
+        amount = -max(neg_debt, neg_credit)
+        append((debtor_id, creditor_id, amount))
+
+        # Keep the remainder on top of its heap in one sift instead of pop + push
+        if amount - (-neg_debt) < -tolerance:
+            heapq.heapreplace(debtors, (neg_debt + amount, debtor_id))
+        else:
+            heapq.heappop(debtors)
+        if amount - (-neg_credit) < -tolerance:
+            heapq.heapreplace(creditors, (neg_credit + amount, creditor_id))
+        else:
+            heapq.heappop(creditors)
+
+    return transfers
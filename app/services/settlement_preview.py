@@ -0,0 +1,142 @@
+# app/services/settlement_preview.py
+# Live "who owes whom" per event and currency, kept up to date by the expense writes
+# instead of being recomputed on every read
+
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.models.money import currency_exponent
+from app.services.balances import BalanceMatrix, round_preserving_total
+from app.services.cross_rates import CrossRateMatrix
+from app.services.lru import LRUCache
+from app.services.settlement import Transfer, plan_payments
+
+SETTLEMENT_PREVIEW_CACHE_SIZE = int(os.getenv("SETTLEMENT_PREVIEW_CACHE_SIZE", "1000"))
+
+
+class SettlementPreview:
+    """
+    One event's balances converted into one currency, at one event version:
+    - balances: user_id -> converted balance in (fractional) minor units of the currency
+    - factors: source currency -> multiplier from its minor units into ours
+    Expense writes add their deltas here; the payment plan is rebuilt lazily,
+    only when it is read after a change.
+    """
+
+    def __init__(self, currency: str, version: int, rates_key: str, cross_rates: CrossRateMatrix):
+        self.currency = currency
+        self.version = version
+        self.rates_key = rates_key
+        self.cross_rates = cross_rates
+        self.factors: Dict[str, float] = {}
+        self.balances: Dict[str, float] = {}
+        self.total = 0.0
+        self._plan: Optional[Tuple[Dict[str, int], List[Transfer], int]] = None
+
+    def factor(self, currency: str) -> float:
+        """Minor units of currency -> minor units of ours. Raises KeyError for an unsupported currency."""
+        factor = self.factors.get(currency)
+        if factor is None:
+            factor = self.factors[currency] = (
+                self.cross_rates.rate(currency, self.currency)
+                * 10.0 ** (currency_exponent(self.currency) - currency_exponent(currency))
+            )
+        return factor
+
+    @classmethod
+    def build(cls, event: dict, currency: str, rates_key: str, cross_rates: CrossRateMatrix) -> "SettlementPreview":
+        """Full computation from the stored balances - the slow path, taken once per version miss"""
+        preview = cls(currency, event.get("version", 0), rates_key, cross_rates)
+        matrix = BalanceMatrix.from_event(event)
+        factors = np.array([preview.factor(c) for c in matrix.currencies])
+        converted = matrix.values @ factors if matrix.currencies else np.zeros(len(matrix.member_ids))
+        preview.balances = matrix.as_dict(converted)
+        preview.total = sum(
+            amount * preview.factor(c) for c, amount in event.get("total_expenses_by_currency", {}).items()
+        )
+        return preview
+
+    def apply(self, increments: Dict[str, int]):
+        """Add an expense write's $inc deltas (currency_balances.* / total_expenses_by_currency.*)"""
+        for path, delta in increments.items():
+            parts = path.split(".")
+            if parts[0] == "currency_balances":
+                user_id = parts[2]
+                self.balances[user_id] = self.balances.get(user_id, 0.0) + delta * self.factor(parts[1])
+            elif parts[0] == "total_expenses_by_currency":
+                self.total += delta * self.factor(parts[1])
+        self._plan = None
+
+    def plan(self) -> Tuple[Dict[str, int], List[Transfer], int]:
+        """(balances, transfers, total), all in integer minor units - cached until the next change"""
+        if self._plan is None:
+            user_ids = list(self.balances)
+            rounded = round_preserving_total(np.fromiter(self.balances.values(), dtype=float, count=len(user_ids)))
+            balances = {user_id: int(value) for user_id, value in zip(user_ids, rounded)}
+            self._plan = (balances, plan_payments(balances, tolerance=0), int(round(self.total)))
+        return self._plan
+
+
+class SettlementPreviewCache:
+    """
+    Bounded LRU of previews keyed by (event_id, currency).
+    A write at version v updates a preview only if the preview is at v - 1, so
+    out-of-order writes (or ones made by another process) just drop it - the next
+    read sees the version mismatch and rebuilds.
+    """
+
+    def __init__(self, max_size: int = SETTLEMENT_PREVIEW_CACHE_SIZE):
+        self._entries: LRUCache[Tuple[str, str], SettlementPreview] = LRUCache(
+            max_size, extra_counters=("rebuilds", "incremental_updates", "dropped"),
+            on_evict=lambda key, _: self._forget(*key)
+        )
+        self._by_event: Dict[str, set] = {}
+
+    def get(self, event_id: str, currency: str, version: int, rates_key: str) -> Optional[SettlementPreview]:
+        return self._entries.get(
+            (event_id, currency), lambda preview: preview.version == version and preview.rates_key == rates_key
+        )
+
+    def put(self, event_id: str, preview: SettlementPreview):
+        self._entries.put((event_id, preview.currency), preview)
+        self._by_event.setdefault(event_id, set()).add(preview.currency)
+        self._entries.count("rebuilds")
+
+    def apply(self, event_id: str, increments: Dict[str, int], version: int):
+        """An expense write produced version with these $inc deltas"""
+        for currency in list(self._by_event.get(event_id, ())):
+            preview = self._entries.peek((event_id, currency))
+            if preview.version != version - 1:
+                self._drop(event_id, currency)
+                continue
+            try:
+                preview.apply(increments)
+            except KeyError:
+                self._drop(event_id, currency)  # expense in a currency the rates do not cover
+                continue
+            preview.version = version
+            self._entries.count("incremental_updates")
+
+    def advance(self, event_id: str, version: int):
+        """A write produced version without changing any balance (finalize, dropping an empty currency)"""
+        self.apply(event_id, {}, version)
+
+    def _drop(self, event_id: str, currency: str):
+        self._entries.pop((event_id, currency))
+        self._forget(event_id, currency)
+        self._entries.count("dropped")
+
+    def _forget(self, event_id: str, currency: str):
+        currencies = self._by_event.get(event_id)
+        if currencies is not None:
+            currencies.discard(currency)
+            if not currencies:
+                del self._by_event[event_id]
+
+    def stats(self) -> Dict[str, float]:
+        return self._entries.stats()
+
+
+settlement_previews = SettlementPreviewCache()
@@ -1,55 +1,284 @@
 # app/services/simple_exchange_rates.py
+import os
+import threading
+import time
+from datetime import datetime
 import requests
-from typing import Dict
+from typing import Dict, Optional, Tuple
+
+from app.services.cross_rates import CrossRateMatrix
+from app.services.log import get_logger
+from app.services.tracing import span
+
+logger = get_logger(__name__)
+
+# How long fetched rates count as fresh, and how often the background thread refetches
+RATES_TTL_SECONDS = float(os.getenv("EXCHANGE_RATES_TTL_SECONDS", "3600"))
+RATES_REFRESH_SECONDS = float(os.getenv("EXCHANGE_RATES_REFRESH_SECONDS", "900"))
+
+# Rates provider - point it at a local stand-in server for tests
+RATES_API_URL = os.getenv("EXCHANGE_RATES_API_URL", "https://api.exchangerate-api.com/v4/latest/USD")
+RATES_TIMEOUT_SECONDS = float(os.getenv("EXCHANGE_RATES_TIMEOUT_SECONDS", "10"))
+
+# Circuit breaker: after this many failed fetches in a row, stop calling the
+# provider for BREAKER_RESET_SECONDS and serve cached or fallback rates
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("EXCHANGE_RATES_BREAKER_FAILURES", "3"))
+BREAKER_RESET_SECONDS = float(os.getenv("EXCHANGE_RATES_BREAKER_RESET_SECONDS", "60"))
+
+
+class _Flight:
+    """One in-flight fetch that concurrent refresh() callers wait on"""
 
-class SimpleExchangeRates:
-    """שירות פשוט לקבלת 5 שערי מטבעות נפוצים מול USD"""
-    
     def __init__(self):
+        self.done = threading.Event()
+        self.ok = False
+
+
+class SimpleExchangeRates:
+    """שירות פשוט לקבלת שערי מטבעות מול USD - כל המטבעות שהספק מחזיר"""
+
+    def __init__(
+        self,
+        ttl_seconds: float = RATES_TTL_SECONDS,
+        api_url: str = RATES_API_URL,
+        timeout_seconds: float = RATES_TIMEOUT_SECONDS,
+        failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+        reset_seconds: float = BREAKER_RESET_SECONDS
+    ):
         # API חינמי לגמרי - לא צריך מפתח
-        self.api_url = "https://api.exchangerate-api.com/v4/latest/USD"
-        self.currencies = ["EUR", "GBP", "ILS", "JPY", "CAD"]  # 5 מטבעות נפוצים
-        
+        self.api_url = api_url
+        self.timeout_seconds = timeout_seconds
+
+        # In-process cache - get_rates() only ever reads it, the network is
+        # hit from refresh() which runs on a background thread
+        self.ttl_seconds = ttl_seconds
+        self._rates: Optional[Dict[str, float]] = None
+        self._cross_rates: Optional[CrossRateMatrix] = None  # built once per fetch, not per lookup
+        self._fallback_cross_rates: Optional[CrossRateMatrix] = None
+        self._fetched_at: Optional[float] = None  # time.monotonic() of the last good fetch
+        self._last_updated: Optional[datetime] = None
+        self._lock = threading.Lock()
+        self._inflight: Optional[_Flight] = None
+        self._stop_event = threading.Event()
+        self._refresher: Optional[threading.Thread] = None
+
+        # Circuit breaker state
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._consecutive_failures = 0
+        self._breaker_opened_at: Optional[float] = None
+
+        self._stats = {
+            "hits": 0, "stale_hits": 0, "misses": 0,
+            "refreshes": 0, "refresh_failures": 0,
+            "upstream_requests": 0, "coalesced": 0,
+            "breaker_opens": 0, "breaker_short_circuits": 0
+        }
+
     def get_rates(self) -> Dict[str, float]:
         """
-        קבלת שערי חליפין עדכניים
+        שערי חליפין מהמטמון - לעולם לא מחכה לרשת
         מחזיר: {"EUR": 0.85, "GBP": 0.73, "ILS": 3.7, "JPY": 110.0, "CAD": 1.25}
+
+        - fresh cache: returned as is
+        - stale cache (older than the TTL): returned as is, a refresh starts in the background
+        - empty cache: fallback rates, a refresh starts in the background
+        """
+        with self._lock:
+            rates = self._rates
+            if rates is None:
+                self._stats["misses"] += 1
+            elif self._age() > self.ttl_seconds:
+                self._stats["stale_hits"] += 1
+            else:
+                self._stats["hits"] += 1
+                return rates
+
+        self.refresh_in_background()
+        return rates if rates is not None else self._get_fallback_rates()
+
+    def get_cross_rates(self) -> CrossRateMatrix:
+        """get_rates() as a precomputed cross-rate matrix - same cache, never waits on the network"""
+        with span("exchange_rates.cross_rates"):
+            return self._cross_rates_for(self.get_rates())
+
+    def _cross_rates_for(self, rates: Dict[str, float]) -> CrossRateMatrix:
+        with self._lock:
+            if rates is self._rates and self._cross_rates is not None:
+                return self._cross_rates
+            fetched = self._rates is not None
+        if fetched:
+            # A refresh swapped the cache between the two reads - rare, build without caching
+            return CrossRateMatrix(rates)
+        if self._fallback_cross_rates is None:
+            self._fallback_cross_rates = CrossRateMatrix(rates)
+        return self._fallback_cross_rates
+
+    def refresh(self) -> bool:
+        """
+        Fetch rates from the API into the cache. Keeps the old rates if the fetch fails.
+
+        Single-flight: while a fetch is running, other callers wait for it and
+        share its result, so a burst of refreshes makes one upstream request.
         """
-        
+        with self._lock:
+            flight = self._inflight
+            leader = flight is None
+            if leader:
+                flight = self._inflight = _Flight()
+            else:
+                self._stats["coalesced"] += 1
+
+        if not leader:
+            flight.done.wait()
+            return flight.ok
+
+        try:
+            flight.ok = self._refresh_through_breaker()
+        finally:
+            with self._lock:
+                self._inflight = None
+            flight.done.set()
+        return flight.ok
+
+    def refresh_in_background(self):
+        """Start a one-off refresh thread unless a fetch is in flight or the breaker is open"""
+        with self._lock:
+            if self._inflight is not None:
+                return
+            if self._breaker_is_open():
+                self._stats["breaker_short_circuits"] += 1
+                return
+        threading.Thread(target=self.refresh, name="exchange-rates-refresh", daemon=True).start()
+
+    def _refresh_through_breaker(self) -> bool:
+        """One fetch, skipped entirely while the circuit breaker is open"""
+        with self._lock:
+            if self._breaker_is_open():
+                self._stats["breaker_short_circuits"] += 1
+                return False
+
+        rates = self._fetch_rates()
+        cross_rates = CrossRateMatrix(rates) if rates is not None else None
+        with self._lock:
+            if rates is None:
+                self._stats["refresh_failures"] += 1
+                self._consecutive_failures += 1
+                if self._consecutive_failures >= self.failure_threshold:
+                    if self._breaker_opened_at is None:
+                        self._stats["breaker_opens"] += 1
+                    # (Re)open - a failed half-open trial restarts the cool-down
+                    self._breaker_opened_at = time.monotonic()
+                return False
+            self._rates = rates
+            self._cross_rates = cross_rates
+            self._fetched_at = time.monotonic()
+            self._last_updated = datetime.utcnow()
+            self._consecutive_failures = 0
+            self._breaker_opened_at = None
+            self._stats["refreshes"] += 1
+            return True
+
+    def _breaker_is_open(self) -> bool:
+        """Open for reset_seconds after it trips, then lets one trial fetch through (half-open)"""
+        if self._breaker_opened_at is None:
+            return False
+        return time.monotonic() - self._breaker_opened_at < self.reset_seconds
+
+    def start_background_refresh(self, interval_seconds: float = RATES_REFRESH_SECONDS):
+        """Keep the cache warm: refresh now and then every interval_seconds"""
+        if self._refresher and self._refresher.is_alive():
+            return
+        self._stop_event.clear()
+
+        def run():
+            while not self._stop_event.is_set():
+                self.refresh()
+                self._stop_event.wait(interval_seconds)
+
+        self._refresher = threading.Thread(target=run, name="exchange-rates-refresher", daemon=True)
+        self._refresher.start()
+
+    def stop_background_refresh(self):
+        self._stop_event.set()
+
+    @property
+    def last_updated(self) -> Optional[datetime]:
+        """UTC time of the last successful fetch (None while only fallback rates are known)"""
+        return self._last_updated
+
+    def fetched_snapshot(self) -> Optional[Tuple[datetime, Dict[str, float]]]:
+        """(last_updated, rates) of the last successful fetch, or None - fallback rates are never returned"""
+        with self._lock:
+            if self._rates is None or self._last_updated is None:
+                return None
+            return self._last_updated, dict(self._rates)
+
+    def cache_stats(self) -> Dict[str, object]:
+        """Hit/miss counters and cache age, for monitoring"""
+        with self._lock:
+            stats = dict(self._stats)
+            lookups = stats["hits"] + stats["stale_hits"] + stats["misses"]
+            stats["hit_rate"] = (stats["hits"] + stats["stale_hits"]) / lookups if lookups else 0.0
+            stats["age_seconds"] = round(self._age(), 3) if self._fetched_at is not None else None
+            stats["ttl_seconds"] = self.ttl_seconds
+            stats["cached_currencies"] = len(self._rates) if self._rates else 0
+            stats["refreshing"] = self._inflight is not None
+            if self._breaker_opened_at is None:
+                stats["breaker_state"] = "closed"
+            else:
+                stats["breaker_state"] = "open" if self._breaker_is_open() else "half-open"
+            return stats
+
+    def _age(self) -> float:
+        """Seconds since the last good fetch (infinite if there never was one)"""
+        if self._fetched_at is None:
+            return float("inf")
+        return time.monotonic() - self._fetched_at
+
+    def _fetch_rates(self) -> Optional[Dict[str, float]]:
+        """קריאה אחת ל-API - מחזיר None אם נכשלה"""
+
         try:
-            print("Fetching exchange rates from API...")
-            
+            logger.debug("Fetching exchange rates", extra={"url": self.api_url})
+
             # קריאה ל-API
-            response = requests.get(self.api_url, timeout=10)
+            with self._lock:
+                self._stats["upstream_requests"] += 1
+            # Usually runs on the refresh thread, outside any request - then the span is a no-op
+            with span("exchange_rates.fetch", url=self.api_url):
+                response = requests.get(self.api_url, timeout=self.timeout_seconds)
             response.raise_for_status()
-            
+
             data = response.json()
             all_rates = data.get("rates", {})
-            
-            # סינון רק המטבעות שאנחנו רוצים
-            filtered_rates = {}
-            for currency in self.currencies:
-                if currency in all_rates:
-                    filtered_rates[currency] = round(all_rates[currency], 4)
-                else:
-                    print(f"Warning: {currency} not found in API response")
-            
-            print(f"Successfully fetched rates for {len(filtered_rates)} currencies")
-            return filtered_rates
-            
+
+            # כל המטבעות שהספק מחזיר (USD עצמו הוא הבסיס)
+            rates = {
+                currency: float(rate)
+                for currency, rate in all_rates.items()
+                if currency != "USD" and isinstance(rate, (int, float)) and rate > 0
+            }
+            if not rates:
+                logger.warning("Exchange-rate response has no usable rates")
+                return None
+
+            logger.info("Fetched exchange rates for %d currencies", len(rates))
+            return rates
+
         except requests.exceptions.RequestException as e:
-            print(f"API request failed: {e}")
-            return self._get_fallback_rates()
-        except Exception as e:
-            print(f"Unexpected error: {e}")
-            return self._get_fallback_rates()
-    
+            logger.warning("Exchange-rate request failed: %s", e)
+            return None
+        except Exception:
+            logger.exception("Unexpected error while fetching exchange rates")
+            return None
+
     def _get_fallback_rates(self) -> Dict[str, float]:
         """שערים בסיסיים במקרה של בעיה"""
-        print("Using fallback exchange rates")
+        logger.debug("Using fallback exchange rates")
         return {
             "EUR": 0.85,    # יורו
-            "GBP": 0.73,    # לירה שטרלינג  
+            "GBP": 0.73,    # לירה שטרלינג
             "ILS": 3.7,     # שקל ישראלי
             "JPY": 110.0,   # ין יפני
             "CAD": 1.25     # דולר קנדי
@@ -0,0 +1,306 @@
+# app/services/tracing.py
+# Per-request spans: where a request's time went (Mongo commands, JWT decoding,
+# the exchange-rate HTTP call, response serialization). The current trace lives in
+# a contextvar, so any code running for the request - including Motor's executor
+# threads, which copy the context - can add spans without it being passed around.
+#
+# Requests slower than SLOW_REQUEST_MS are logged with a span breakdown and the
+# shape of their Mongo queries. If OTEL_EXPORTER_OTLP_ENDPOINT is set and the
+# opentelemetry packages are installed, every trace is also exported over OTLP.
+
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import monitoring
+
+from app.services.log import get_logger
+from app.services.metrics import route_template
+
+logger = get_logger(__name__)
+
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "500"))
+OTLP_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT")
+SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "splitbills")
+
+
+class Span:
+    __slots__ = ("name", "start", "end", "attributes")
+
+    def __init__(self, name: str, start: float, end: float, attributes: Dict[str, object]):
+        self.name = name
+        self.start = start  # time.perf_counter() seconds
+        self.end = end
+        self.attributes = attributes
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end - self.start) * 1000
+
+
+class Trace:
+    """All spans of one request. Appends come from the event loop and from driver threads."""
+
+    def __init__(self, method: str, route: str):
+        self.method = method
+        self.route = route
+        self.start = time.perf_counter()
+        self.start_ns = time.time_ns()  # wall clock, for the exporter
+        self.end: Optional[float] = None
+        self.status = 500
+        self.spans: List[Span] = []
+        self._lock = Lock()
+
+    def add(self, span: Span):
+        with self._lock:
+            self.spans.append(span)
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end or time.perf_counter()) - self.start) * 1000
+
+    def breakdown(self) -> Dict[str, Tuple[int, float]]:
+        """span name -> (count, total ms)"""
+        totals: Dict[str, Tuple[int, float]] = {}
+        for span in self.spans:
+            count, total = totals.get(span.name, (0, 0.0))
+            totals[span.name] = (count + 1, total + span.duration_ms)
+        return totals
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Time a block as a span of the current request (does nothing outside a request)"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(Span(name, start, time.perf_counter(), attributes))
+
+
+# -----------------------------
+# MongoDB
+# -----------------------------
+
+def query_shape(value):
+    """A filter/sort/projection with the values replaced by "?" - what the query looks like, not what it asked for"""
+    if isinstance(value, dict):
+        return {key: query_shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [query_shape(item) for item in value[:1]] + (["..."] if len(value) > 1 else [])
+    return "?"
+
+
+def command_shape(command_name: str, command) -> Dict[str, object]:
+    shape: Dict[str, object] = {}
+    if command_name in ("find", "count", "distinct"):
+        for key in ("filter", "query", "sort", "projection"):
+            if key in command:
+                shape[key] = query_shape(command[key])
+    elif command_name == "delete":
+        first = next(iter(command.get("deletes", ())), {})
+        shape["filter"] = query_shape(first.get("q", {}))
+    elif command_name == "findAndModify":
+        shape["filter"] = query_shape(command.get("query", {}))
+        update = command.get("update")
+        shape["update"] = sorted(update) if isinstance(update, dict) else "pipeline"
+        if "fields" in command:
+            shape["projection"] = query_shape(command["fields"])
+    elif command_name == "update":
+        first = next(iter(command.get("updates", ())), {})
+        shape["filter"] = query_shape(first.get("q", {}))
+        update = first.get("u")
+        shape["update"] = sorted(update) if isinstance(update, dict) else "pipeline"
+    elif command_name == "aggregate":
+        shape["pipeline"] = [next(iter(stage), "?") for stage in command.get("pipeline", ())]
+    return shape
+
+
+class MongoTracing(monitoring.CommandListener):
+    """Adds a span per Mongo command to the trace that was current when the command started"""
+
+    def __init__(self):
+        self._pending: Dict[Tuple[object, int], Tuple[Trace, float, Dict[str, object]]] = {}
+        self._lock = Lock()
+
+    def started(self, event):
+        trace = _current_trace.get()
+        if trace is None:
+            return
+        command = event.command
+        collection = command.get(event.command_name) if event.command_name != "getMore" else command.get("collection")
+        attributes = {"collection": collection if isinstance(collection, str) else "", "command": event.command_name}
+        attributes.update(command_shape(event.command_name, command))
+        with self._lock:
+            self._pending[(event.connection_id, event.request_id)] = (trace, time.perf_counter(), attributes)
+
+    def succeeded(self, event):
+        self._finish(event, "ok")
+
+    def failed(self, event):
+        self._finish(event, "error")
+
+    def _finish(self, event, outcome: str):
+        with self._lock:
+            pending = self._pending.pop((event.connection_id, event.request_id), None)
+        if pending is None:
+            return
+        trace, start, attributes = pending
+        attributes["outcome"] = outcome
+        # The driver's own duration excludes our bookkeeping; anchor it at the start we saw
+        trace.add(Span(f"mongo.{event.command_name}", start, start + event.duration_micros / 1e6, attributes))
+
+
+mongo_tracing = MongoTracing()
+
+
+# -----------------------------
+# FastAPI response serialization
+# -----------------------------
+
+def install_fastapi_hooks():
+    """Time response_model validation and dumping (fastapi.routing.serialize_response) as pydantic.serialize"""
+    import fastapi.routing
+
+    original = fastapi.routing.serialize_response
+    if getattr(original, "_traced", False):
+        return
+
+    async def serialize_response(*args, **kwargs):
+        with span("pydantic.serialize"):
+            return await original(*args, **kwargs)
+
+    serialize_response._traced = True
+    fastapi.routing.serialize_response = serialize_response
+
+
+# -----------------------------
+# Middleware, slow log and export
+# -----------------------------
+
+def slow_request_fields(trace: Trace) -> Dict[str, object]:
+    """Structured breakdown for the slow-request log: time per span name and per Mongo query shape"""
+    spans = {
+        name: {"count": count, "ms": round(total_ms, 2)}
+        for name, (count, total_ms) in sorted(trace.breakdown().items(), key=lambda item: -item[1][1])
+    }
+    traced_ms = sum(entry["ms"] for entry in spans.values())
+
+    shapes: Dict[str, Dict[str, object]] = {}
+    for s in trace.spans:
+        if s.name.startswith("mongo."):
+            shape = {key: value for key, value in s.attributes.items() if key != "outcome"}
+            entry = shapes.setdefault(repr(shape), {"shape": shape, "count": 0, "ms": 0.0})
+            entry["count"] += 1
+            entry["ms"] = round(entry["ms"] + s.duration_ms, 2)
+    return {
+        "method": trace.method,
+        "route": trace.route,
+        "status": trace.status,
+        "duration_ms": round(trace.duration_ms, 2),
+        "spans": spans,
+        "untraced_ms": round(max(trace.duration_ms - traced_ms, 0.0), 2),
+        "mongo_queries": sorted(shapes.values(), key=lambda entry: -entry["ms"]),
+    }
+
+
+class OtlpExporter:
+    """Replays finished traces into the OpenTelemetry SDK, which batches them to the collector"""
+
+    def __init__(self, endpoint: str):
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+        from opentelemetry import trace as otel_trace
+
+        provider = TracerProvider(resource=Resource.create({"service.name": SERVICE_NAME}))
+        provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter(endpoint=f"{endpoint.rstrip('/')}/v1/traces")))
+        self._provider = provider
+        self._tracer = provider.get_tracer("app.services.tracing")
+        self._set_span_in_context = otel_trace.set_span_in_context
+
+    def export(self, trace: Trace):
+        def wall_ns(perf: float) -> int:
+            return trace.start_ns + int((perf - trace.start) * 1e9)
+
+        root = self._tracer.start_span(
+            f"{trace.method} {trace.route}", start_time=trace.start_ns,
+            attributes={"http.method": trace.method, "http.route": trace.route, "http.status_code": trace.status}
+        )
+        context = self._set_span_in_context(root)
+        for s in trace.spans:
+            attributes = {key: value if isinstance(value, (str, int, float, bool)) else str(value) for key, value in s.attributes.items()}
+            child = self._tracer.start_span(s.name, context=context, start_time=wall_ns(s.start), attributes=attributes)
+            child.end(end_time=wall_ns(s.end))
+        root.end(end_time=wall_ns(trace.end))
+
+    def shutdown(self):
+        self._provider.shutdown()
+
+
+def _make_exporter() -> Optional[OtlpExporter]:
+    if not OTLP_ENDPOINT:
+        return None
+    try:
+        exporter = OtlpExporter(OTLP_ENDPOINT)
+    except ImportError:
+        logger.warning(
+            "OTEL_EXPORTER_OTLP_ENDPOINT is set but opentelemetry-sdk / opentelemetry-exporter-otlp-proto-http "
+            "are not installed - not exporting traces"
+        )
+        return None
+    logger.info("Exporting traces over OTLP", extra={"endpoint": OTLP_ENDPOINT})
+    return exporter
+
+
+otlp_exporter = _make_exporter()
+
+
+class TracingMiddleware:
+    """Opens a trace per HTTP request; logs it if slow and exports it if OTLP is configured"""
+
+    def __init__(self, app, fastapi_app=None, slow_request_ms: float = SLOW_REQUEST_MS):
+        self.app = app
+        self.fastapi_app = fastapi_app
+        self.slow_request_ms = slow_request_ms
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.fastapi_app is None:
+            await self.app(scope, receive, send)
+            return
+
+        trace = Trace(scope["method"], route_template(self.fastapi_app, scope))
+        token = _current_trace.set(trace)
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                trace.status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            trace.end = time.perf_counter()
+            _current_trace.reset(token)
+            if trace.duration_ms >= self.slow_request_ms:
+                logger.warning(
+                    "Slow request %s %s -> %d in %.1f ms", trace.method, trace.route, trace.status, trace.duration_ms,
+                    extra=slow_request_fields(trace)
+                )
+            if otlp_exporter is not None:
+                otlp_exporter.export(trace)
@@ -0,0 +1,58 @@
+# app/services/view_cache.py
+# In-process cache of rendered event views (JSON bytes), keyed by event version
+
+import hashlib
+import os
+from typing import Dict, Hashable, Optional, Tuple
+
+from app.services.lru import LRUCache
+
+EVENT_VIEW_CACHE_SIZE = int(os.getenv("EVENT_VIEW_CACHE_SIZE", "1000"))
+
+
+class RenderedViewCache:
+    """
+    Bounded LRU of rendered responses.
+    Keys start with (event_id, version): every mutation bumps the version, so
+    an entry can never be served for a changed event - old versions just age out.
+    """
+
+    def __init__(self, max_size: int = EVENT_VIEW_CACHE_SIZE):
+        self._entries: LRUCache[Tuple[Hashable, ...], bytes] = LRUCache(max_size, extra_counters=("not_modified",))
+
+    def get(self, key: Tuple[Hashable, ...]) -> Optional[bytes]:
+        return self._entries.get(key)
+
+    def put(self, key: Tuple[Hashable, ...], body: bytes):
+        self._entries.put(key, body)
+
+    def record_not_modified(self):
+        """Count a 304 answered from the version alone"""
+        self._entries.count("not_modified")
+
+    def stats(self) -> Dict[str, float]:
+        return self._entries.stats()
+
+
+def make_etag(event_id: str, version: int, variant: Tuple[Hashable, ...] = ()) -> str:
+    """
+    Strong ETag for one rendering of an event version. variant holds whatever else
+    shapes the body (page size, cursor, summary), so different views never share a tag.
+    """
+    if not variant:
+        return f'"{event_id}-{version}"'
+    digest = hashlib.sha1(repr(variant).encode()).hexdigest()[:12]
+    return f'"{event_id}-{version}-{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match check (weak comparison, supports lists and *)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+event_view_cache = RenderedViewCache()
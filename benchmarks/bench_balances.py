@@ -0,0 +1,98 @@
+# benchmarks/bench_balances.py
+# Balance engine vs the per-member dict loops the routes used before.
+#
+# Usage (from the repository root):
+#   python -m benchmarks.bench_balances
+#   python -m benchmarks.bench_balances --members 10 1000 10000 --currencies 5
+
+import argparse
+import random
+import time
+from typing import Dict
+
+from app.services.balances import BalanceMatrix
+
+
+def make_event(members: int, currencies: int, seed: int = 7) -> dict:
+    rng = random.Random(seed)
+    codes = [f"C{i:02d}" for i in range(currencies)]
+    member_ids = [f"user{i}" for i in range(members)]
+    return {
+        "members": [{"user_id": uid, "email": f"{uid}@example.com"} for uid in member_ids],
+        # Balances in minor units, like the stored documents
+        "currency_balances": {code: {uid: rng.randint(-10000, 10000) for uid in member_ids} for code in codes},
+    }
+
+
+def legacy_totals(event: dict) -> Dict[str, float]:
+    """Per-member balance loop that was copy-pasted in three routes"""
+    totals = {}
+    for m in event["members"]:
+        total_balance = 0.0
+        for currency, balances in event.get("currency_balances", {}).items():
+            total_balance += balances.get(m["user_id"], 0.0)
+        totals[m["user_id"]] = total_balance
+    return totals
+
+
+def legacy_convert(event: dict, rates: Dict[str, float]) -> Dict[str, float]:
+    """finalize_event's conversion loop"""
+    final_balances = {m["user_id"]: 0.0 for m in event["members"]}
+    for currency, balances in event.get("currency_balances", {}).items():
+        for user_id, balance in balances.items():
+            final_balances[user_id] += balance * rates[currency]
+    return final_balances
+
+
+def engine_totals(event: dict) -> Dict[str, float]:
+    matrix = BalanceMatrix.from_event(event)
+    return matrix.as_dict(matrix.totals())
+
+
+def engine_totals_touched(event: dict) -> Dict[str, float]:
+    """return=minimal: only the members an expense touched (3 here)"""
+    touched = [m["user_id"] for m in event["members"][:3]]
+    matrix = BalanceMatrix.from_event(event, touched)
+    return matrix.as_dict(matrix.totals())
+
+
+def engine_convert(event: dict, rates: Dict[str, float]) -> Dict[str, float]:
+    matrix = BalanceMatrix.from_event(event)
+    return matrix.as_dict(matrix.convert(matrix.rate_vector(rates, "USD"), "USD"))
+
+
+def best_ms(fn, *args, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Balance engine benchmark")
+    parser.add_argument("--members", type=int, nargs="+", default=[10, 1000, 10000])
+    parser.add_argument("--currencies", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'members':>8} | {'op':>8} | {'legacy ms':>10} | {'engine ms':>10}")
+    print("-" * 46)
+    for members in args.members:
+        event = make_event(members, args.currencies)
+        rates = {code: 1.0 + i / 10 for i, code in enumerate(event["currency_balances"])}
+        for op, legacy, engine, extra in (
+            ("totals", legacy_totals, engine_totals, ()),
+            ("convert", legacy_convert, engine_convert, (rates,)),
+        ):
+            legacy_ms = best_ms(legacy, event, *extra, repeat=args.repeat)
+            engine_ms = best_ms(engine, event, *extra, repeat=args.repeat)
+            print(f"{members:>8} | {op:>8} | {legacy_ms:>10.2f} | {engine_ms:>10.2f}")
+        # The old minimal response still ran the full loop; the engine builds only the touched rows
+        touched_ms = best_ms(engine_totals_touched, event, repeat=args.repeat)
+        print(f"{members:>8} | {'touched':>8} | {best_ms(legacy_totals, event, repeat=args.repeat):>10.2f} | {touched_ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+# benchmarks/bench_endpoints.py
+# End-to-end endpoint latency: drives the FastAPI app in-process (httpx ASGI transport)
+# against an in-memory MongoDB stand-in or a local mongod, sweeping the event size.
+#
+# Usage (from the repository root, extra packages in benchmarks/requirements.txt):
+#   python -m benchmarks.bench_endpoints                                  # mongomock, 10..10,000 expenses
+#   python -m benchmarks.bench_endpoints --backend mongod --mongo-url mongodb://127.0.0.1:27017
+#   python -m benchmarks.bench_endpoints --sizes 10 1000 --requests 100 --output new.json
+#   python -m benchmarks.bench_endpoints --compare old.json --max-slowdown 1.5
+#
+# With --backend mongod the data goes to a throwaway database (--database, dropped
+# before and after the run), never to the app's own "splitbills" database.
+# --compare exits with status 1 if any endpoint's p95 got slower than --max-slowdown x.
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, List, Optional
+
+import numpy as np
+
+# The rates provider is never called from a benchmark - requests fail fast and fallback rates are used
+os.environ.setdefault("EXCHANGE_RATES_API_URL", "http://127.0.0.1:9/unreachable")
+
+def use_database(backend: str, mongo_url: str, database: str):
+    """Point app.services.db at the benchmark database - must run before any app route is imported"""
+    import app.services.db as db_module
+
+    if backend == "mongomock":
+        from mongomock_motor import AsyncMongoMockClient
+        db_module.client = AsyncMongoMockClient()
+    else:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        db_module.client = AsyncIOMotorClient(mongo_url, serverSelectionTimeoutMS=5000)
+    db_module.db = db_module.client[database]
+    return db_module.db
+
+
+def summarize(endpoint: str, expenses: Optional[int], latencies: List[float], wall_seconds: float) -> dict:
+    ms = np.array(latencies) * 1000
+    return {
+        "endpoint": endpoint,
+        "expenses": expenses,
+        "requests": len(latencies),
+        "throughput_rps": round(len(latencies) / wall_seconds, 1) if wall_seconds else None,
+        "mean_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+    }
+
+
+async def measure(
+    endpoint: str,
+    expenses: Optional[int],
+    call: Callable[[int], Awaitable[None]],
+    requests: int,
+    concurrency: int,
+    before: Optional[Callable[[], Awaitable[None]]] = None
+) -> dict:
+    """
+    Run call(i) requests times, concurrency at a time, and time each call.
+    before() runs untimed ahead of every call (e.g. to drop a cache).
+    """
+    latencies: List[float] = []
+
+    async def one(i: int):
+        if before:
+            await before()
+        start = time.perf_counter()
+        await call(i)
+        latencies.append(time.perf_counter() - start)
+
+    wall_start = time.perf_counter()
+    for batch_start in range(0, requests, concurrency):
+        await asyncio.gather(*(one(i) for i in range(batch_start, min(batch_start + concurrency, requests))))
+    return summarize(endpoint, expenses, latencies, time.perf_counter() - wall_start)
+
+
+def expect(response, status: int = 200):
+    if response.status_code != status:
+        raise RuntimeError(f"{response.request.method} {response.request.url} -> {response.status_code}: {response.text[:300]}")
+
+
+async def run(args) -> List[dict]:
+    db = use_database(args.backend, args.mongo_url, args.database)
+    await db.client.drop_database(args.database)
+
+    import httpx
+    from app.main import app
+    from app.services.indexes import ensure_indexes
+    from app.services.view_cache import event_view_cache
+    from benchmarks.datagen import BENCH_PASSWORD, EMAIL_DOMAIN, DataGenerator
+
+    if args.backend == "mongod":
+        await ensure_indexes()
+
+    generator = DataGenerator(db, seed=args.seed)
+    users = await generator.seed_users(args.members + 1)
+    owner, members = users[0], users[1:]
+    for user in users:
+        user["_id"] = user.get("_id") or (await db["users"].find_one({"email": user["email"]}))["_id"]
+
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        login = await client.post("/users/login", json={"email": owner["email"], "password": BENCH_PASSWORD})
+        expect(login)
+        headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+        # Size-independent endpoints
+        async def register(i: int):
+            expect(await client.post("/users/register", json={
+                "name": f"new {i}", "email": f"new{i}@{EMAIL_DOMAIN}", "password": BENCH_PASSWORD
+            }))
+        results.append(await measure("register", None, register, args.requests, args.concurrency))
+
+        async def login_call(i: int):
+            expect(await client.post("/users/login", json={"email": owner["email"], "password": BENCH_PASSWORD}))
+        results.append(await measure("login", None, login_call, args.requests, args.concurrency))
+
+        member_emails = [{"email": m["email"]} for m in members]
+
+        async def create_event(i: int):
+            expect(await client.post("/events/", json={"name": f"created {i}", "members": member_emails}, headers=headers))
+        results.append(await measure("create_event", None, create_event, args.requests, args.concurrency))
+
+        async def my_events(i: int):
+            expect(await client.get("/events/my-events", headers=headers))
+        results.append(await measure("my_events", None, my_events, args.requests, args.concurrency))
+
+        # Event-size sweep
+        split = [owner] + members[:2]
+        expense_body = {
+            "amount": 30, "currency": "EUR", "note": "bench",
+            "participants": [
+                {"email": u["email"], "responsible_for": 10, "paid": 30 if i == 0 else 0} for i, u in enumerate(split)
+            ]
+        }
+        for size in args.sizes:
+            print(f"[BENCH] Seeding an event with {size} expenses...", file=sys.stderr)
+            event_id = await generator.seed_event(owner, members, size, name=f"bench {size}")
+
+            async def get_event(i: int):
+                expect(await client.get(f"/events/{event_id}", headers=headers))
+            results.append(await measure("get_event", size, get_event, args.requests, args.concurrency))
+
+            async def drop_view_cache():
+                event_view_cache._entries.clear()
+            results.append(await measure(
+                "get_event_uncached", size, get_event, args.requests, args.concurrency, before=drop_view_cache
+            ))
+
+            async def finalize(i: int):
+                expect(await client.post(f"/events/{event_id}/finalize", params={"final_currency": "USD"}, headers=headers))
+
+            async def forget_settlement():
+                # Every call does the full computation, not the stored-result shortcut
+                from bson import ObjectId
+                await db["events"].update_one({"_id": ObjectId(event_id)}, {"$unset": {"last_settlement": ""}})
+            results.append(await measure(
+                "finalize_event", size, finalize, args.requests, args.concurrency, before=forget_settlement
+            ))
+
+            async def add_expense(i: int):
+                expect(await client.post(f"/events/{event_id}/expenses", json=expense_body, headers=headers))
+            results.append(await measure("add_flexible_expense", size, add_expense, args.requests, args.concurrency))
+
+    if args.backend == "mongod":
+        await db.client.drop_database(args.database)
+    return results
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def print_table(results: List[dict]):
+    print(f"{'endpoint':>22} | {'expenses':>8} | {'req/s':>8} | {'p50 ms':>8} | {'p95 ms':>8} | {'p99 ms':>8}")
+    print("-" * 78)
+    for r in results:
+        size = "-" if r["expenses"] is None else r["expenses"]
+        print(f"{r['endpoint']:>22} | {size:>8} | {r['throughput_rps']:>8} | "
+              f"{r['p50_ms']:>8.2f} | {r['p95_ms']:>8.2f} | {r['p99_ms']:>8.2f}")
+
+
+def compare(results: List[dict], baseline_path: str, max_slowdown: float) -> bool:
+    """Print p95 ratios against a baseline file. Returns False if any endpoint regressed."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(r["endpoint"], r["expenses"]): r for r in json.load(f)["results"]}
+
+    ok = True
+    print(f"\nAgainst {baseline_path} (p95, slower than {max_slowdown}x fails):")
+    for r in results:
+        old = baseline.get((r["endpoint"], r["expenses"]))
+        if not old or not old["p95_ms"]:
+            continue
+        ratio = r["p95_ms"] / old["p95_ms"]
+        regressed = ratio > max_slowdown
+        ok = ok and not regressed
+        size = "-" if r["expenses"] is None else r["expenses"]
+        print(f"{r['endpoint']:>22} | {size:>8} | {old['p95_ms']:>8.2f} -> {r['p95_ms']:>8.2f} | "
+              f"x{ratio:.2f}{'  REGRESSION' if regressed else ''}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Endpoint latency benchmark")
+    parser.add_argument("--backend", choices=["mongomock", "mongod"], default="mongomock")
+    parser.add_argument("--mongo-url", default="mongodb://127.0.0.1:27017")
+    parser.add_argument("--database", default="splitbills_bench")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000],
+                        help="expenses per event to sweep")
+    parser.add_argument("--members", type=int, default=10, help="members per event besides the owner")
+    parser.add_argument("--requests", type=int, default=50, help="timed requests per endpoint and size")
+    parser.add_argument("--concurrency", type=int, default=1, help="requests in flight at once")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="bench_endpoints.json", help="where to write the JSON results")
+    parser.add_argument("--compare", help="earlier results file to compare p95 against")
+    parser.add_argument("--max-slowdown", type=float, default=1.5)
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    report = {
+        "meta": {
+            "started_at": datetime.utcnow().isoformat(),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "backend": args.backend,
+            "members": args.members,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    print_table(results)
+    print(f"\nResults written to {args.output}")
+    if args.compare and not compare(results, args.compare, args.max_slowdown):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
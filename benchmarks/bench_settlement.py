@@ -0,0 +1,88 @@
+# benchmarks/bench_settlement.py
+# Compares the heap-based settlement engine with the old nested debtor x creditor loop.
+#
+# Usage (from the repository root):
+#   python -m benchmarks.bench_settlement
+#   python -m benchmarks.bench_settlement --sizes 10 1000 100000 --legacy-limit 100000
+#
+# The old loop is O(D*C); with 100,000 members that is ~2.5 billion iterations,
+# so by default it only runs up to --legacy-limit members.
+
+import argparse
+import random
+import time
+from typing import Dict, List, Tuple
+
+from app.services.settlement import plan_payments
+
+
+def legacy_plan_payments(balances: Dict[str, float]) -> List[Tuple[str, str, float]]:
+    """The matching loop finalize_event used before the settlement module (kept as-is)"""
+    payments = []
+    debtors = [(uid, abs(balance)) for uid, balance in balances.items() if balance < -0.01]
+    creditors = [(uid, balance) for uid, balance in balances.items() if balance > 0.01]
+
+    for debtor_id, debt in debtors:
+        for creditor_id, credit in creditors:
+            if debt > 0.01 and credit > 0.01:
+                payment_amount = min(debt, credit)
+                payments.append((debtor_id, creditor_id, payment_amount))
+                debt -= payment_amount
+                credit -= payment_amount
+    return payments
+
+
+def random_balances(members: int, seed: int = 42) -> Dict[str, float]:
+    """Random balances that sum to zero, like the ones finalize_event produces"""
+    rng = random.Random(seed)
+    values = [rng.uniform(-500, 500) for _ in range(members)]
+    mean = sum(values) / members
+    return {f"user{i}": value - mean for i, value in enumerate(values)}
+
+
+def overpaid_total(balances: Dict[str, float], transfers) -> float:
+    """How much creditors received above what they were owed"""
+    received: Dict[str, float] = {}
+    for _, creditor_id, amount in transfers:
+        received[creditor_id] = received.get(creditor_id, 0.0) + amount
+    return sum(max(0.0, amount - balances[uid]) for uid, amount in received.items())
+
+
+def timed(fn, balances, repeat: int) -> Tuple[float, list]:
+    """Best wall time in milliseconds over `repeat` runs"""
+    best = float("inf")
+    result = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(balances)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Settlement engine benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 100000])
+    parser.add_argument("--legacy-limit", type=int, default=10000,
+                        help="largest group the O(D*C) legacy loop is run on")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'members':>9} | {'engine':>6} | {'ms':>10} | {'transfers':>9} | {'overpaid':>12}")
+    print("-" * 59)
+    for size in args.sizes:
+        balances = random_balances(size)
+        engines = [("heap", plan_payments)]
+        if size <= args.legacy_limit:
+            engines.append(("legacy", legacy_plan_payments))
+
+        for name, fn in engines:
+            ms, transfers = timed(fn, balances, args.repeat)
+            overpaid = overpaid_total(balances, transfers)
+            print(f"{size:>9} | {name:>6} | {ms:>10.2f} | {len(transfers):>9} | {overpaid:>12.2f}")
+
+        if size > args.legacy_limit:
+            print(f"{size:>9} | {'legacy':>6} | {'skipped':>10} | (O(D*C), raise --legacy-limit to run)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# benchmarks/datagen.py
+# Synthetic users, events and expenses, written straight to the database in the
+# same shape the API writes them (minor units, counters, per-currency balances).
+#
+# Seeded with a fixed RNG so two runs against two versions see the same data.
+
+import random
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from app.models.money import MONEY_UNITS, currency_exponent
+from app.routes.events import _expense_increments, _merge_increments
+from app.routes.users import hash_password
+
+BENCH_PASSWORD = "bench-password"
+EMAIL_DOMAIN = "bench.dev"
+CURRENCIES = ["USD", "EUR", "GBP", "ILS", "JPY"]
+
+
+class DataGenerator:
+    def __init__(self, db, seed: int = 42):
+        self.db = db
+        self.rng = random.Random(seed)
+        self._password_hash = hash_password(BENCH_PASSWORD)  # one hash, every user shares the password
+
+    async def seed_users(self, count: int, prefix: str = "user") -> List[dict]:
+        """count users with emails <prefix><i>@bench.dev, all with BENCH_PASSWORD"""
+        now = datetime.utcnow()
+        users = [
+            {
+                "name": f"{prefix} {i}",
+                "email": f"{prefix}{i}@{EMAIL_DOMAIN}",
+                "password_hash": self._password_hash,
+                "created_at": now
+            }
+            for i in range(count)
+        ]
+        if users:
+            await self.db["users"].insert_many(users)
+        return users
+
+    def _expense(self, event_oid, members: List[dict], created_at: datetime) -> dict:
+        """One expense split equally among 2-4 members, paid by the first of them"""
+        currency = self.rng.choice(CURRENCIES)
+        participants = self.rng.sample(members, k=min(len(members), self.rng.randint(2, 4)))
+        share = self.rng.randint(1, 50) * 10 ** currency_exponent(currency)  # whole units keep the split exact
+        amount = share * len(participants)
+        return {
+            "event_id": event_oid,
+            "created_by": participants[0]["user_id"],
+            "amount": amount,
+            "currency": currency,
+            "participants": [
+                {
+                    "user_id": m["user_id"],
+                    "email": m["email"],
+                    "responsible_for": share,
+                    "paid": amount if i == 0 else 0
+                }
+                for i, m in enumerate(participants)
+            ],
+            "note": "",
+            "expense_type": "advanced",
+            "money_units": MONEY_UNITS,
+            "created_at": created_at
+        }
+
+    async def seed_event(self, creator: dict, members: List[dict], expenses: int, name: str = "bench") -> str:
+        """An event with the given members and expenses, balances and counters filled in. Returns its ID."""
+        member_refs = [{"user_id": str(u["_id"]), "email": u["email"]} for u in [creator] + members]
+        start = datetime.utcnow() - timedelta(seconds=expenses)
+        event = {
+            "name": name,
+            "base_currency": None,
+            "created_by": str(creator["_id"]),
+            "created_at": start,
+            "members": member_refs,
+            "expenses_count": expenses,
+            "version": expenses,
+            "money_units": MONEY_UNITS,
+            "currency_balances": {},
+            "total_expenses_by_currency": {},
+            "last_activity_at": start
+        }
+        result = await self.db["events"].insert_one(event)
+        event_oid = result.inserted_id
+
+        totals: Dict[str, int] = {}
+        batch = []
+        for i in range(expenses):
+            expense = self._expense(event_oid, member_refs, start + timedelta(seconds=i))
+            totals = _merge_increments(totals, _expense_increments(expense))
+            batch.append(expense)
+            if len(batch) == 1000:
+                await self.db["expenses"].insert_many(batch)
+                batch = []
+        if batch:
+            await self.db["expenses"].insert_many(batch)
+
+        # The same dotted paths the API $incs, applied once
+        if totals:
+            await self.db["events"].update_one({"_id": event_oid}, {"$inc": totals})
+        return str(event_oid)